@@ -0,0 +1,74 @@
+##Runs analyses off the Qt event thread
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+class AnalysisWorker(QObject):
+    """ runs analysis functions on a background thread, only the latest
+    request is allowed to finish and older ones are cancelled at their next
+    progress report. The analysis function must take a progress callback
+    keyword argument.
+    signals:    progress(request id, stage name)
+                finished(request id, result)
+                failed(request id, error message)"""
+
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # numpy and scipy release the GIL while solving, so one thread keeps the UI free
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._latest = 0
+
+    def submit(self, function, *args, **kwargs):
+        """ queue an analysis, cancelling the ones still running or waiting
+
+        Returns:
+            id of the request, passed back with its signals
+        """
+        with self._lock:
+            request_id = self._latest = next(self._ids)
+        self._executor.submit(self._run, request_id, function, args, kwargs)
+        return request_id
+
+    def cancel(self):
+        """ cancel every submitted request"""
+        with self._lock:
+            self._latest = next(self._ids)
+
+    def is_current(self, request_id):
+        with self._lock:
+            return request_id == self._latest
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, request_id, function, args, kwargs):
+        def report(stage):
+            if not self.is_current(request_id):
+                raise AnalysisCancelled()
+            self.progress.emit(request_id, stage)
+
+        try:
+            report('started')
+            result = function(*args, progress=report, **kwargs)
+        except AnalysisCancelled:
+            return
+        except Exception as error:
+            if self.is_current(request_id):
+                self.failed.emit(request_id, str(error))
+            return
+        if self.is_current(request_id):
+            self.finished.emit(request_id, result)
@@ -0,0 +1,163 @@
+##Headless batch analysis of many beams
+""" analyse beam definitions from a JSON Lines or CSV file on a process pool
+and stream the results as they complete
+
+    python batch.py beams.jsonl --output results.jsonl --arrays-dir arrays --cache-dir cache
+
+every beam has the arguments of calculator_two.perform_analysis_determinate:
+    {"id": "b1", "length": 10, "elasticity": 2e8, "inertia": 1e-4, "num_elements": 100,
+     "supports": [[2, 0], [1, 10]], "point_loads": [[10, 5]],
+     "distributed_loads": [["2*x", 0, 10]], "moments": [], "tolerance": 1e-3}
+in CSV files the list columns hold the same JSON lists. One line per beam is
+written to the output with the maxima and support reactions, the diagrams
+go to <arrays-dir>/<id>.npz. With --cache-dir beams analysed before (by
+any run or the GUI) are read from the result cache instead of solved. With
+--server host:port the beams are sent to a running beam_analyzer.server
+from threads instead of being solved in local processes.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+LIST_FIELDS = ('supports', 'point_loads', 'distributed_loads', 'moments')
+FLOAT_FIELDS = ('length', 'elasticity', 'inertia', 'tolerance')
+
+
+def read_beams(path, file_format=None):
+    """ yield beam definitions one at a time so the input is never held in memory"""
+    if file_format is None:
+        file_format = 'csv' if path.endswith('.csv') else 'jsonl'
+    with open(path, newline='') as file:
+        if file_format == 'jsonl':
+            for line_number, line in enumerate(file):
+                if line.strip():
+                    beam = json.loads(line)
+                    beam.setdefault('id', str(line_number))
+                    yield beam
+        else:
+            for row_number, row in enumerate(csv.DictReader(file)):
+                beam = {key: value for key, value in row.items() if value not in (None, '')}
+                for field in LIST_FIELDS:
+                    beam[field] = json.loads(beam.get(field, '[]'))
+                for field in FLOAT_FIELDS:
+                    if field in beam:
+                        beam[field] = float(beam[field])
+                if 'num_elements' in beam:
+                    beam['num_elements'] = int(beam['num_elements'])
+                beam.setdefault('id', str(row_number))
+                yield beam
+
+
+def analyze_beam(beam, arrays_dir=None, cache_dir=None, server=None):
+    """ analyse one beam definition and return its summary"""
+    import numpy as np
+    from beam_analyzer import result_cache
+
+    summary = {'id': beam['id']}
+    arguments = (float(beam['length']), beam['elasticity'], beam['inertia'], int(beam.get('num_elements', 100)),
+                 [tuple(support) for support in beam.get('supports', [])],
+                 [tuple(load) for load in beam.get('point_loads', [])],
+                 [tuple(load) for load in beam.get('distributed_loads', [])],
+                 [tuple(moment) for moment in beam.get('moments', [])])
+    try:
+        if server is not None:
+            from beam_analyzer.server import AnalysisClient
+            data = AnalysisClient(server).analyze(*arguments, tolerance=beam.get('tolerance'))
+        else:
+            cache = result_cache.ResultCache(cache_dir) if cache_dir is not None else None
+            data = result_cache.cached_analysis(cache, *arguments, tolerance=beam.get('tolerance'))
+    except Exception as error:
+        summary.update(status='error', error=f'{type(error).__name__}: {error}')
+        return summary
+
+    summary.update(
+        status='ok',
+        num_nodes=len(data['node_coords']),
+        max_shear=float(np.abs(data['shear_forces']).max()),
+        max_moment=float(np.abs(data['bending_moments']).max()),
+        max_deflection=float(np.abs(data['deflections']).max()),
+        support_reactions=[{key: int(value) if key == 'type' else float(value) for key, value in reaction.items()}
+                           for reaction in data['support_reactions']])
+    if arrays_dir is not None:
+        path = os.path.join(arrays_dir, f"{beam['id']}.npz")
+        np.savez(path, **{key: data[key] for key in ('node_coords', 'shear_forces', 'bending_moments', 'deflections')})
+        summary['arrays'] = path
+    return summary
+
+
+def analyze_chunk(beams, arrays_dir=None, cache_dir=None, server=None):
+    return [analyze_beam(beam, arrays_dir, cache_dir, server) for beam in beams]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(beams, output, arrays_dir=None, workers=None, chunk_size=16, max_pending=None, cache_dir=None, server=None):
+    """ analyse the beams on a process pool and write one JSON line per beam
+    to the output file object as soon as its chunk is done. At most
+    max_pending chunks (2 per worker by default) are in flight, so memory
+    does not grow with the number of beams. With a server address the
+    workers are threads that wait on the server, which batches their beams.
+
+    Returns:
+        (number of beams, number of failures)
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    if arrays_dir is not None:
+        os.makedirs(arrays_dir, exist_ok=True)
+
+    total = failures = 0
+    chunks = chunked(beams, chunk_size)
+    with (ThreadPoolExecutor if server is not None else ProcessPoolExecutor)(max_workers=workers) as executor:
+        pending = set()
+        while True:
+            for chunk in itertools.islice(chunks, max_pending - len(pending)):
+                pending.add(executor.submit(analyze_chunk, chunk, arrays_dir, cache_dir, server))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for summary in future.result():
+                    output.write(json.dumps(summary) + '\n')
+                    total += 1
+                    failures += summary['status'] != 'ok'
+            output.flush()
+    return total, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse many beams without the GUI")
+    parser.add_argument('input', help="beam definitions (.jsonl or .csv)")
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help="input format, guessed from the extension by default")
+    parser.add_argument('--output', '-o', default='-', help="JSON Lines results file, - for stdout")
+    parser.add_argument('--arrays-dir', help="directory for the .npz diagrams of every beam")
+    parser.add_argument('--workers', '-j', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=16, help="beams per work unit")
+    parser.add_argument('--cache-dir', help="result cache shared with other runs and the GUI")
+    parser.add_argument('--server', help="host:port of a running beam_analyzer.server to send the beams to")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        total, failures = run_batch(read_beams(args.input, args.format), output, args.arrays_dir, args.workers, args.chunk_size,
+                                    cache_dir=args.cache_dir, server=args.server)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{total} beams analysed, {failures} failed", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
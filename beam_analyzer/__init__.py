@@ -0,0 +1,49 @@
+##Beam analysis core
+""" the analysis code without the GUI, importing the package loads nothing:
+submodules and the main functions are imported on first use, sympy only for
+symbolic work and scipy only when a system is solved. Qt and matplotlib are
+never imported from here.
+
+    import beam_analyzer
+    data = beam_analyzer.perform_analysis_determinate(10, 2e8, 1e-4, 100, [(2, 0), (1, 10)], [(10, 5)], [], [])
+"""
+import importlib
+
+SUBMODULES = ('analysis_session', 'beam_model', 'calculator_one', 'calculator_two',
+              'downsampling', 'expression_cache', 'out_of_core', 'parameter_sweep', 'profiling', 'result_cache',
+              'server', 'singularity')
+
+# name -> submodule it is imported from
+EXPORTS = {
+    'perform_analysis_determinate': 'calculator_two',
+    'perform_analysis_load_cases': 'calculator_two',
+    'influence_lines': 'calculator_two',
+    'moving_load_analysis': 'calculator_two',
+    'modal_analysis': 'calculator_two',
+    'BeamModel': 'beam_model',
+    'AnalysisSession': 'analysis_session',
+    'sweep': 'parameter_sweep',
+    'downsample_min_max': 'downsampling',
+    'ResultCache': 'result_cache',
+    'cached_analysis': 'result_cache',
+    'perform_analysis_out_of_core': 'out_of_core',
+    'determinate_diagrams': 'singularity',
+    'AnalysisServer': 'server',
+    'AnalysisClient': 'server',
+}
+
+__all__ = list(SUBMODULES) + list(EXPORTS)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    if name in EXPORTS:
+        value = getattr(importlib.import_module(f'{__name__}.{EXPORTS[name]}'), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,156 @@
+##Incremental re-analysis of a beam while its loads are edited
+import hashlib
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+
+from . import calculator_two as calc
+
+LOAD_KINDS = ('point_loads', 'distributed_loads', 'moments')
+
+
+def geometry_key(length, elasticity, inertia, node_coords, supports):
+    """ hashable fingerprint of everything the factored stiffness depends on"""
+    digest = hashlib.sha1()
+    for array in (np.multiply(elasticity, inertia), node_coords):
+        digest.update(np.ascontiguousarray(array, dtype=float).tobytes())
+        digest.update(b'|')
+    return (float(length), digest.hexdigest(), tuple((int(kind), float(position)) for kind, position in supports))
+
+
+class AnalysisSession:
+    """ stateful analysis of one beam at a time. The assembled and factored
+    stiffness of the last max_systems geometries is kept (least recently used
+    ones are dropped) and every load keeps its own contribution to the force
+    vector, so adding, changing or removing a load only updates the force
+    vector by that contribution and re-runs the back substitution.
+    variables:  max_systems = number of factored geometries kept"""
+
+    def __init__(self, max_systems=8):
+        self.max_systems = max_systems
+        self.hits = 0
+        self.misses = 0
+        self._systems = OrderedDict()
+        self._ids = itertools.count()
+        self.system = None
+        self.node_coords = None
+        self.supports = []
+        self.loads = {}          # load id -> (kind, load)
+        self._contributions = {} # load id -> (dofs, values)
+        self.global_f = None
+
+    def set_geometry(self, length, elasticity, inertia, supports, num_elements=100, node_coords=None):
+        """ switch to a beam geometry, reusing its factorization when it was
+        seen recently. Loads that are not on a node are spread with the shape
+        functions, so nodal results stay exact on any mesh. Meshes finer than
+        calculator_two.MAX_SOLVE_ELEMENTS are factored on their solve_mesh and
+        the results recovered at their nodes."""
+        if node_coords is None:
+            node_coords = calc.build_mesh(length, elasticity, inertia, num_elements, supports)
+        node_coords = np.asarray(node_coords, dtype=float)
+        key = geometry_key(length, elasticity, inertia, node_coords, supports)
+        if key in self._systems:
+            self.hits += 1
+            self._systems.move_to_end(key)
+        else:
+            self.misses += 1
+            self._systems[key] = calc.assemble_system(node_coords, elasticity, inertia, supports)
+            if len(self._systems) > self.max_systems:
+                self._systems.popitem(last=False)
+        if self.system is not self._systems[key]:
+            self.system = self._systems[key]
+            # a system solved on the mesh itself keeps its own array of it
+            solve_coords = self.system['node_coords']
+            self.node_coords = solve_coords if len(solve_coords) == len(node_coords) else node_coords
+            self.supports = list(supports)
+            # the load vectors depend on the mesh
+            self.global_f = np.zeros(2 * len(self.system['node_coords']))
+            self._contributions.clear()
+            for load_id in self.loads:
+                self._add_contribution(load_id)
+        return key
+
+    def invalidate(self):
+        """ forget every factored geometry"""
+        self._systems.clear()
+        self.system = None
+        self.node_coords = None
+        self.global_f = None
+        # set_geometry adds every load to the new force vector again
+        self._contributions.clear()
+
+    def add_load(self, kind, load):
+        """ add a load ('point_loads', 'distributed_loads' or 'moments' with
+        the usual tuple) and return its id"""
+        if kind not in LOAD_KINDS:
+            raise ValueError("Invalid load kind")
+        load_id = next(self._ids)
+        self.loads[load_id] = (kind, tuple(load))
+        if self.system is not None:
+            self._add_contribution(load_id)
+        return load_id
+
+    def update_load(self, load_id, load):
+        """ replace the values of a load"""
+        kind, _ = self.loads[load_id]
+        self._remove_contribution(load_id)
+        self.loads[load_id] = (kind, tuple(load))
+        if self.system is not None:
+            self._add_contribution(load_id)
+
+    def remove_load(self, load_id):
+        self._remove_contribution(load_id)
+        del self.loads[load_id]
+
+    def solve(self):
+        """ plots_data of the current loads, as perform_analysis_determinate"""
+        if self.system is None:
+            raise ValueError("The session has no geometry, call set_geometry first")
+        node_coords = self.node_coords
+        u = calc.solve_system(self.system, self.global_f)
+        loads = self._loads_by_kind()
+        if self.system['node_coords'] is node_coords:
+            element_loads = calc.element_load_vectors(node_coords, loads['point_loads'], loads['distributed_loads'], loads['moments'], nodal=False)
+            element_forces = calc.element_end_forces(self.system, u, element_loads)
+            deflections = u[::2]
+        else:
+            element_forces, deflections = calc.recover_nodal_values(self.system, u, node_coords, loads['point_loads'],
+                                                                    loads['distributed_loads'], loads['moments'])
+        return {
+            'node_coords': node_coords,
+            'shear_forces': element_forces[0::2],
+            'bending_moments': element_forces[1::2],
+            'deflections': deflections,
+            'support_reactions': calc.support_reactions(node_coords, self.supports, element_forces)
+        }
+
+    def sample(self, positions):
+        """ the diagrams of the current loads at any positions, exact inside
+        the elements (see calculator_two.sample_diagrams)"""
+        if self.system is None:
+            raise ValueError("The session has no geometry, call set_geometry first")
+        u = calc.solve_system(self.system, self.global_f)
+        loads = self._loads_by_kind()
+        return calc.sample_diagrams(self.system, u, positions, loads['point_loads'], loads['distributed_loads'], loads['moments'])
+
+    def cache_info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._systems), 'maxsize': self.max_systems}
+
+    def _loads_by_kind(self):
+        return {kind: [load for load_kind, load in self.loads.values() if load_kind == kind] for kind in LOAD_KINDS}
+
+    def _add_contribution(self, load_id):
+        kind, load = self.loads[load_id]
+        loads = {other: [] for other in LOAD_KINDS}
+        loads[kind] = [load]
+        vector = calc.system_load_vector(self.system, loads['point_loads'], loads['distributed_loads'], loads['moments'])
+        # keep only the DOFs the load touches
+        dofs = np.flatnonzero(vector)
+        self._contributions[load_id] = (dofs, vector[dofs])
+        self.global_f[dofs] += vector[dofs]
+
+    def _remove_contribution(self, load_id):
+        if load_id in self._contributions:
+            dofs, values = self._contributions.pop(load_id)
+            self.global_f[dofs] -= values
@@ -0,0 +1,112 @@
+##Compact beam model shared by both calculators
+import numpy as np
+
+# load kind codes, supports are 2 + support type (1 - Roller, 2 - Pin, 3 - Fixed)
+POINT_LOAD = 0
+DISTRIBUTED_LOAD = 1
+MOMENT = 2
+ROLLER = 3
+PIN = 4
+FIXED = 5
+
+
+class BeamModel:
+    """ beam definition stored as contiguous arrays, one row per load or support
+    variables:  start, end = position of the row (equal except for distributed loads) (m)
+                force = force of the row, NaN while a support reaction is unknown
+                moment = moment of the row, NaN while a fixed support moment is unknown
+                kind = load kind code of the row
+                expressions = side table {row: load expression} of the distributed loads"""
+
+    def __init__(self, length, num_rows):
+        self.length = length
+        self.start = np.zeros(num_rows)
+        self.end = np.zeros(num_rows)
+        self.force = np.zeros(num_rows)
+        self.moment = np.zeros(num_rows)
+        self.kind = np.zeros(num_rows, dtype=np.int8)
+        self.expressions = {}
+
+    @classmethod
+    def from_inputs(cls, length, supports, point_loads, distributed_loads, moments):
+        """ model of the tuple lists the calculators take, rows are ordered
+        point loads, distributed loads, moments, supports"""
+        counts = [len(point_loads), len(distributed_loads), len(moments), len(supports)]
+        offsets = np.cumsum([0] + counts)
+        model = cls(length, offsets[-1])
+
+        rows = slice(offsets[0], offsets[1])
+        if counts[0]:
+            model.force[rows], model.start[rows] = np.asarray(point_loads, dtype=float).T
+        model.kind[rows] = POINT_LOAD
+
+        rows = slice(offsets[1], offsets[2])
+        for row, (load_expr, start, end) in enumerate(distributed_loads, offsets[1]):
+            model.start[row], model.end[row] = start, end
+            model.expressions[row] = load_expr
+        model.force[rows] = np.nan
+        model.kind[rows] = DISTRIBUTED_LOAD
+
+        rows = slice(offsets[2], offsets[3])
+        if counts[2]:
+            model.moment[rows], model.start[rows] = np.asarray(moments, dtype=float).T
+        model.kind[rows] = MOMENT
+
+        rows = slice(offsets[3], offsets[4])
+        if counts[3]:
+            support_types, model.start[rows] = np.asarray(supports, dtype=float).T
+            if not np.isin(support_types, (1, 2, 3)).all():
+                raise ValueError("Invalid support type")
+            model.kind[rows] = 2 + support_types
+        model.force[rows] = np.nan
+        model.moment[model.kind == FIXED] = np.nan
+
+        distributed = model.kind == DISTRIBUTED_LOAD
+        model.end[~distributed] = model.start[~distributed]
+        return model
+
+    @property
+    def support_rows(self):
+        return np.flatnonzero(self.kind >= ROLLER)
+
+    @property
+    def supports(self):
+        rows = self.support_rows
+        return [(int(kind) - 2, position) for kind, position in zip(self.kind[rows], self.start[rows])]
+
+    @property
+    def point_loads(self):
+        rows = self.kind == POINT_LOAD
+        return np.column_stack([self.force[rows], self.start[rows]])
+
+    @property
+    def distributed_loads(self):
+        return [(self.expressions[row], self.start[row], self.end[row]) for row in np.flatnonzero(self.kind == DISTRIBUTED_LOAD)]
+
+    @property
+    def moments(self):
+        rows = self.kind == MOMENT
+        return np.column_stack([self.moment[rows], self.start[rows]])
+
+    def set_reactions(self, forces, moments=None):
+        """ store the support reactions (in support order), fixed supports also take a moment"""
+        rows = self.support_rows
+        self.force[rows] = forces
+        if moments is not None:
+            fixed = rows[self.kind[rows] == FIXED]
+            self.moment[fixed] = np.asarray(moments)[self.kind[rows] == FIXED]
+
+    def as_table(self):
+        """ the object array [start position, end position, force, moment] used
+        before the model existed, distributed loads hold their sympy expression"""
+        table = np.empty((len(self.kind), 4), dtype=object)
+        table[:, 0] = self.start
+        table[:, 1] = self.end
+        table[:, 2] = self.force
+        table[:, 3] = self.moment
+        if self.expressions:
+            # sympy is only needed for the distributed loads of the legacy table
+            from . import expression_cache
+        for row, load_expr in self.expressions.items():
+            table[row, 2] = expression_cache.parse(load_expr)
+        return table
@@ -0,0 +1,180 @@
+##Statically determinate beam analysis
+
+import numpy as np
+from . import profiling
+from .beam_model import BeamModel, POINT_LOAD, MOMENT, FIXED
+
+def perform_analysis_determinate(length, elasticity, inertia, supports, point_loads, distributed_loads, moments, symbolic=False):
+    """ this function will perform the analysis of the beam
+    ### and return the shear force and bending moment diagrams
+    ### as well as the deflection of the beam.
+    ### variables: length = length of the beam (m)
+    ###            elasticity = elasticity of the beam (Pa)
+    ###            inertia = inertia of the beam (m^4)
+    ###            supports = list of supports (type, position)
+    ###            point_loads = list of point loads (force, position)
+    ###            distributed_loads = list of distributed loads (function, start, end)
+    ###            moments = list of moments (moment, position)
+    ###            symbolic = solve the reactions with sympy instead of numpy"""
+
+
+    with profiling.profile('calculator_one'):
+        #Beam defintion
+        with profiling.stage('model'):
+            model = BeamModel.from_inputs(length, supports, point_loads, distributed_loads, moments)
+        with profiling.stage('symbolic reactions' if symbolic else 'reactions'):
+            analyze_model(model, symbolic)
+        with profiling.stage('table'):
+            beam = model.as_table() ## beam = [start position, end position, force, moment]
+    # the table is an array, so the timings are only kept in profiling.recent
+    return beam
+
+
+def analyze_model(model, symbolic=False):
+    """ solve the support reactions of a BeamModel and store them in it"""
+    support_reactions = {str(name): value for name, value in calculation_support_forces(model, symbolic).items()}
+    forces = [support_reactions[f'R_{i}'] for i in range(len(model.support_rows))]
+    moments = [support_reactions.get(f'M_{i}', 0) for i in range(len(model.support_rows))]
+    model.set_reactions(np.array(forces, dtype=float), np.array(moments, dtype=float))
+    return model
+
+    
+def equal_force_distributed_loads(distributed_load) -> (tuple): ##(function, start position, end position)
+    # the antiderivatives are cached per expression, see expression_cache.cache_info()
+    from . import expression_cache
+    equal_force, first_moment = expression_cache.integrals(*distributed_load)
+
+    position = first_moment / equal_force
+
+    return (equal_force, position)
+
+
+def equilibrium_system(model):
+    """ equilibrium of the beam as a small float system A @ r = b, the first
+    equation sums the forces and the second the moments about x = 0.
+    The unknowns r are the support forces in support order followed by the
+    moments of the fixed supports."""
+    loads = (model.kind == POINT_LOAD) | (model.kind == MOMENT)
+    sigma_F = model.force[loads].sum()
+    sigma_M = model.force[loads] @ model.start[loads] + model.moment[loads].sum()
+    if model.expressions:
+        # sympy is only imported for beams with distributed loads
+        from . import expression_cache
+    for row, load_expr in model.expressions.items():
+        equal_force, first_moment = expression_cache.compile_expression(load_expr).numeric_integrals(model.start[row], model.end[row])
+        sigma_F += equal_force
+        sigma_M += first_moment
+
+    rows = model.support_rows
+    fixed = model.kind[rows] == FIXED
+    profiling.record('num_unknowns', len(rows) + int(fixed.sum()))
+    A = np.zeros((2, len(rows) + fixed.sum()))
+    A[0, :len(rows)] = 1
+    A[1, :len(rows)] = model.start[rows]
+    A[1, len(rows):] = 1
+    return A, -np.array([sigma_F, sigma_M])
+
+
+def check_determinate(model):
+    """ two equilibrium equations solve exactly two unknowns, any other
+    number of support reactions raises ValueError"""
+    rows = model.support_rows
+    num_unknowns = len(rows) + int((model.kind[rows] == FIXED).sum())
+    if num_unknowns > 2:
+        raise ValueError(f"The beam is statically indeterminate ({num_unknowns} unknown support reactions "
+                         "for 2 equilibrium equations), use calculator_two")
+    if num_unknowns < 2:
+        raise ValueError("The support reactions have no solution, the beam is unstable")
+
+
+def numeric_support_forces(model):
+    """ support reactions of a determinate beam with numpy only
+
+    Returns:
+        dict {'R_i': force, 'M_i': moment} like the symbolic solution
+    """
+    check_determinate(model)
+    A, b = equilibrium_system(model)
+    try:
+        reactions = np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        raise ValueError("The support reactions have no solution, the beam is unstable")
+    return reaction_names(model, reactions)
+
+
+def reaction_names(model, reactions):
+    """ map the unknowns of equilibrium_system to their R_i / M_i names"""
+    rows = model.support_rows
+    names = [f'R_{i}' for i in range(len(rows))] + [f'M_{i}' for i in np.flatnonzero(model.kind[rows] == FIXED)]
+    return dict(zip(names, reactions.tolist()))
+
+
+def batch_support_forces(models):
+    """ support reactions of many determinate beams with one stacked
+    (batch, 2, 2) solve
+
+    Returns:
+        list of dicts as numeric_support_forces
+    """
+    for model in models:
+        check_determinate(model)
+    if not models:
+        return []
+    systems = [equilibrium_system(model) for model in models]
+    A = np.stack([A for A, _ in systems])
+    b = np.stack([b for _, b in systems])
+    try:
+        reactions = np.linalg.solve(A, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        raise ValueError("The support reactions have no solution, a beam is unstable")
+    return [reaction_names(model, reaction) for model, reaction in zip(models, reactions)]
+
+
+def exact_number(value):
+    import sympy as sp
+    return sp.nsimplify(float(value), rational=True)
+
+
+def calculation_support_forces(model, symbolic=False):
+    if not symbolic:
+        return numeric_support_forces(model)
+    check_determinate(model)
+    import sympy as sp
+    from . import expression_cache
+
+    #===================== Idealization of the beam =====================#
+    # resultant force of every load and its moment about x = 0, as exact
+    # rationals so the redundant equations below stay consistent
+    loads = (model.kind == POINT_LOAD) | (model.kind == MOMENT)
+    sigma_F = exact_number(model.force[loads].sum())
+    sigma_M = exact_number((model.force[loads] * model.start[loads]).sum() + model.moment[loads].sum())
+    for row, load_expr in model.expressions.items():
+        equal_force, first_moment = expression_cache.integrals(load_expr, exact_number(model.start[row]), exact_number(model.end[row]))
+        sigma_F += equal_force
+        sigma_M += first_moment
+    # decimal coefficients in the load expressions come back as Floats
+    sigma_F, sigma_M = sp.nsimplify(sigma_F, rational=True), sp.nsimplify(sigma_M, rational=True)
+
+    #===================== Calculation of support forces =====================#
+    rows = model.support_rows
+    positions = [exact_number(position) for position in model.start[rows]]
+    forces = [sp.Symbol(f'R_{i}') for i in range(len(rows))]
+    moments = [sp.Symbol(f'M_{i}') if model.kind[row] == FIXED else sp.S(0) for i, row in enumerate(rows)]
+    syms = [sym for pair in zip(forces, moments) for sym in pair if isinstance(sym, sp.Symbol)]
+
+    equations = [sigma_F + sum(forces)]
+    for position in positions:
+        ## moment about every support, sum of force * (x - position) + moments
+        moment_equation = sigma_M - position * sigma_F
+        for force, moment, support_position in zip(forces, moments, positions):
+            moment_equation += force * (support_position - position) + moment
+        equations.append(moment_equation)
+
+    #===================== Solving the equations =====================#
+    solution = sp.linsolve(equations, syms)
+    if not solution.args:
+        raise ValueError("The support reactions have no solution, the beam is unstable")
+    total_solution = {}
+    for i in range(len(syms)):
+        total_solution[syms[i]] = solution.args[0][i]
+    return total_solution
@@ -0,0 +1,1173 @@
+##Statically indeterminate beam analysis
+import ast
+import functools
+import numpy as np
+from . import profiling
+
+# K is stored in upper banded form: ab[BANDWIDTH + i - j, j] = K[i, j]
+BANDWIDTH = 3
+
+# the roundoff of the factorization grows with the fourth power of the element
+# count (deflection error 4e-6 at 2000 elements, 4e-2 at 10^4), finer meshes
+# are solved on RECOVERY_ELEMENTS elements and their nodes recovered exactly
+MAX_SOLVE_ELEMENTS = 2000
+RECOVERY_ELEMENTS = 100
+
+# Gauss-Legendre rule used on every panel of a distributed load, exact for
+# load polynomials up to degree 4 against the cubic shape functions
+GAUSS_POINTS, GAUSS_WEIGHTS = np.polynomial.legendre.leggauss(4)
+
+# other loads are integrated on 1, 2, 4 .. panels until two passes agree to
+# LOAD_TOLERANCE (relative to the integral of |q|), at most MAX_LOAD_PANELS
+LOAD_TOLERANCE = 1e-12
+MAX_LOAD_PANELS = 1024
+
+# names available inside distributed load expressions besides x, the
+# functions may also be called as np.<name>
+LOAD_FUNCTIONS = {'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log,
+                  'sin': np.sin, 'cos': np.cos, 'tan': np.tan}
+LOAD_NAMESPACE = {'__builtins__': {}, 'np': np, 'pi': np.pi, **LOAD_FUNCTIONS}
+# the only syntax allowed in them, expressions come from files and the server
+LOAD_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Add, ast.Sub, ast.Mult, ast.Div,
+              ast.Pow, ast.USub, ast.UAdd, ast.Load)
+
+
+def element_stiffness(flexural_rigidity, element_lengths):
+    """ stiffness matrices of all beam elements stacked into a (n, 4, 4) array
+    variables:  flexural_rigidity = E*I of every element (scalar or array of n)
+                element_lengths = length of every element (array of n)"""
+    le = np.asarray(element_lengths, dtype=float)
+    ei = np.broadcast_to(np.asarray(flexural_rigidity, dtype=float), le.shape)
+    one = np.ones_like(le)
+    k_elements = np.empty(le.shape + (4, 4))
+    k_elements[:, 0] = np.stack([12 * one, 6 * le, -12 * one, 6 * le], axis=-1)
+    k_elements[:, 1] = np.stack([6 * le, 4 * le**2, -6 * le, 2 * le**2], axis=-1)
+    k_elements[:, 2] = -k_elements[:, 0]
+    k_elements[:, 3] = np.stack([6 * le, 2 * le**2, -6 * le, 4 * le**2], axis=-1)
+    k_elements *= (ei / le**3)[:, None, None]
+    return k_elements
+
+
+def element_mass(mass_per_length, element_lengths):
+    """ consistent mass matrices of all beam elements (integrals of the products
+    of the Hermite shape functions) stacked into a (n, 4, 4) array
+    variables:  mass_per_length = mass per metre of every element (kg/m, scalar or array of n)
+                element_lengths = length of every element (array of n)"""
+    le = np.asarray(element_lengths, dtype=float)
+    mass = np.broadcast_to(np.asarray(mass_per_length, dtype=float), le.shape)
+    one = np.ones_like(le)
+    m_elements = np.empty(le.shape + (4, 4))
+    m_elements[:, 0] = np.stack([156 * one, 22 * le, 54 * one, -13 * le], axis=-1)
+    m_elements[:, 1] = np.stack([22 * le, 4 * le**2, 13 * le, -3 * le**2], axis=-1)
+    m_elements[:, 2] = np.stack([54 * one, 13 * le, 156 * one, -22 * le], axis=-1)
+    m_elements[:, 3] = np.stack([-13 * le, -3 * le**2, -22 * le, 4 * le**2], axis=-1)
+    m_elements *= (mass * le / 420)[:, None, None]
+    return m_elements
+
+
+def element_dofs(num_elements):
+    """ global DOF numbers of every element, shape (n, 4)"""
+    return 2 * np.arange(num_elements)[:, None] + np.arange(4)
+
+
+def hermite_shape_functions(xi, element_lengths):
+    """ cubic Hermite shape functions of the beam element at the local
+    coordinates xi (0 at the start node, 1 at the end node), shape (..., 4)"""
+    xi = np.asarray(xi, dtype=float)
+    le = np.asarray(element_lengths, dtype=float)
+    return np.stack([1 - 3 * xi**2 + 2 * xi**3,
+                     le * (xi - 2 * xi**2 + xi**3),
+                     3 * xi**2 - 2 * xi**3,
+                     le * (xi**3 - xi**2)], axis=-1)
+
+
+def hermite_shape_derivatives(xi, element_lengths, order=1):
+    """ derivatives d^order/dx^order (order 1 to 3) of the cubic Hermite
+    shape functions, shape (..., 4)"""
+    xi = np.asarray(xi, dtype=float)
+    le = np.asarray(element_lengths, dtype=float)
+    if order == 1:
+        return np.stack([6 * (xi**2 - xi) / le,
+                         1 - 4 * xi + 3 * xi**2,
+                         6 * (xi - xi**2) / le,
+                         3 * xi**2 - 2 * xi], axis=-1)
+    if order == 2:
+        return np.stack([(12 * xi - 6) / le**2,
+                         (6 * xi - 4) / le,
+                         (6 - 12 * xi) / le**2,
+                         (6 * xi - 2) / le], axis=-1)
+    xi, le = np.broadcast_arrays(xi, le)
+    return np.stack([12 / le**3, 6 / le**2, -12 / le**3, 6 / le**2], axis=-1)
+
+
+def check_load_expression(node):
+    """ raise ValueError unless the parsed expression only holds numbers, x,
+    pi, calls of the LOAD_FUNCTIONS (or np.<name> of them) and arithmetic.
+    Integers become floats, so a power overflows instead of growing a huge
+    integer"""
+    if isinstance(node, ast.Call):
+        function = node.func
+        if isinstance(function, ast.Attribute) and isinstance(function.value, ast.Name) and function.value.id == 'np':
+            name = function.attr
+        else:
+            name = function.id if isinstance(function, ast.Name) else None
+        if name not in LOAD_FUNCTIONS or len(node.args) != 1 or node.keywords:
+            raise ValueError(f"Only {', '.join(LOAD_FUNCTIONS)} of one argument can be called in a distributed load")
+        check_load_expression(node.args[0])
+        return
+    if isinstance(node, ast.Constant):
+        if type(node.value) not in (int, float):
+            raise ValueError(f"{node.value!r} is not a number in a distributed load")
+        node.value = float(node.value)
+    elif isinstance(node, ast.Name):
+        if node.id not in ('x', 'pi'):
+            raise ValueError(f"Unknown name {node.id} in a distributed load")
+    elif not isinstance(node, LOAD_NODES):
+        raise ValueError(f"{type(node).__name__} is not allowed in a distributed load")
+    for child in ast.iter_child_nodes(node):
+        check_load_expression(child)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_load_expression(load_expr):
+    """ parse a distributed load expression of x (the coordinate along the
+    beam, m) once and return a vectorized callable q(x). Only arithmetic of
+    numbers, x, pi and the LOAD_FUNCTIONS is accepted (ValueError)"""
+    try:
+        tree = ast.parse(str(load_expr).replace('^', '**'), '<distributed load>', 'eval')
+    except SyntaxError as error:
+        raise ValueError(f"The distributed load {load_expr} is not an expression of x") from error
+    check_load_expression(tree)
+    code = compile(tree, '<distributed load>', 'eval')
+
+    def load_function(x):
+        return np.broadcast_to(eval(code, LOAD_NAMESPACE, {'x': x}), np.shape(x))
+    return load_function
+
+
+def load_moments(load_expr, lo, hi, origin):
+    """ J_j = integral of q(t) (t - origin)^j dt from lo to hi for j = 0..3 and
+    every interval, composite Gauss with the panels doubled until converged.
+    Polynomial loads up to degree 4 are exact on one panel, smooth loads
+    reach LOAD_TOLERANCE within a few doublings, loads with a kink or a
+    singular derivative inside an interval stop at MAX_LOAD_PANELS.
+
+    Returns:
+        (m, 4) array
+    """
+    load_function = compile_load_expression(load_expr)
+    lo, hi, origin = (np.asarray(value, dtype=float)[:, None, None] for value in (lo, hi, origin))
+
+    def composite(todo, panels):
+        width = (hi[todo] - lo[todo]) / panels
+        local = width * (np.arange(panels)[:, None] + (GAUSS_POINTS + 1) / 2)
+        # t - origin from the offsets, not from t, keeps the digits on short elements
+        distance = (lo[todo] - origin[todo]) + local
+        terms = width / 2 * GAUSS_WEIGHTS * load_function(lo[todo] + local)
+        moments, scale = np.empty((len(terms), 4)), np.empty((len(terms), 4))
+        for j in range(4):
+            moments[:, j] = terms.sum(axis=(1, 2))
+            scale[:, j] = np.abs(terms).sum(axis=(1, 2))
+            terms = terms * distance
+        return moments, scale
+
+    todo = np.ones(len(lo), dtype=bool)
+    moments, _ = composite(todo, 1)
+    panels = 1
+    while todo.any() and panels < MAX_LOAD_PANELS:
+        panels *= 2
+        refined, scale = composite(todo, panels)
+        converged = np.all(np.abs(refined - moments[todo]) <= LOAD_TOLERANCE * scale, axis=1)
+        moments[todo] = refined
+        todo[todo] = ~converged
+    return moments
+
+
+def distributed_load_vector(node_coords, load_expr, start, end):
+    """ consistent nodal forces and moments of a distributed load integrated
+    over every element it covers (load_moments, exact for polynomials up to
+    degree 4)
+
+    Returns:
+        (elements, loads) the covered element indices and their (m, 4) nodal loads
+    """
+    start, end = np.clip(sorted((start, end)), node_coords[0], node_coords[-1])
+    first = max(np.searchsorted(node_coords, start, side='right') - 1, 0)
+    last = np.searchsorted(node_coords, end, side='left')
+    elements = np.arange(first, max(last, first))
+    x_start = node_coords[elements]
+    le = node_coords[elements + 1] - x_start
+
+    # only the part of each element covered by the load is integrated, the
+    # shape functions are cubics in s = x - x_start: N_k = sum_j c_kj s^j
+    moments = load_moments(load_expr, np.maximum(x_start, start), np.minimum(x_start + le, end), x_start)
+    zero, one = np.zeros_like(le), np.ones_like(le)
+    coefficients = np.stack([np.stack([one, zero, -3 / le**2, 2 / le**3], axis=-1),
+                             np.stack([zero, one, -2 / le, 1 / le**2], axis=-1),
+                             np.stack([zero, zero, 3 / le**2, -2 / le**3], axis=-1),
+                             np.stack([zero, zero, -1 / le, 1 / le**2], axis=-1)], axis=1)
+    return elements, np.einsum('ej,ekj->ek', moments, coefficients)
+
+
+def key_positions(length, supports=(), point_loads=(), distributed_loads=(), moments=(), min_spacing=None):
+    """ sorted positions where the mesh must have a node: the beam ends,
+    supports, point loads, moments and the ends of distributed loads.
+    Positions closer than min_spacing to the previous one are merged into it."""
+    positions = [0.0, length]
+    positions += [position for _, position in supports]
+    positions += [position for _, position in point_loads]
+    positions += [position for _, position in moments]
+    positions += [bound for _, start, end in distributed_loads for bound in (start, end)]
+    positions = np.unique(np.clip(np.asarray(positions, dtype=float), 0, length))
+    if min_spacing is None:
+        # merge positions that only differ by roundoff
+        min_spacing = 1e-9 * length
+    keep = np.concatenate([[True], np.diff(positions) > min_spacing])
+    keep[:-1] &= positions[:-1] < length - min_spacing
+    keep[-1] = True
+    return positions[keep]
+
+
+def generate_mesh(length, num_elements, supports=(), point_loads=(), distributed_loads=(), moments=()):
+    """ node coordinates with a node exactly at every key position and the
+    segments between them split into elements as close as possible to
+    length / num_elements (a uniform mesh when the positions lie on it).
+    Tiny elements would ruin the conditioning of the stiffness, so positions
+    closer than a thousandth of an element are merged, loads left between
+    nodes are spread with the shape functions and stay exact."""
+    keys = key_positions(length, supports, point_loads, distributed_loads, moments, 1e-3 * length / num_elements)
+    return segment_nodes(keys, segment_counts(keys, num_elements))
+
+
+def segment_counts(keys, num_elements):
+    """ number of elements between consecutive key positions, as close as
+    possible to keys[-1] / num_elements long and at least one per segment"""
+    return np.maximum(np.ceil(np.diff(keys) * num_elements / keys[-1] - 1e-6), 1).astype(int)
+
+
+def segment_nodes(keys, counts, start=0, stop=None):
+    """ the nodes start..stop-1 (all by default) of the mesh splitting the
+    segment between consecutive keys uniformly into counts elements, so a
+    huge mesh can be written chunk by chunk"""
+    num_nodes = int(counts.sum()) + 1
+    stop = num_nodes if stop is None else stop
+    segment_starts = np.cumsum(counts) - counts
+    nodes = np.arange(start, stop)
+    segment = np.searchsorted(segment_starts, nodes, side='right') - 1
+    node_coords = keys[segment] + (nodes - segment_starts[segment]) * (np.diff(keys) / counts)[segment]
+    if stop == num_nodes and stop > start:
+        node_coords[-1] = keys[-1]
+    return node_coords
+
+
+def nearest_nodes(node_coords, positions):
+    """ index of the node closest to every position using a binary search on
+    the sorted node coordinates"""
+    positions = np.asarray(positions, dtype=float)
+    right = np.clip(np.searchsorted(node_coords, positions), 1, len(node_coords) - 1)
+    closer_left = positions - node_coords[right - 1] <= node_coords[right] - positions
+    return right - closer_left
+
+
+def locate_in_elements(node_coords, positions):
+    """ element holding every position and the local coordinate xi in it"""
+    positions = np.asarray(positions, dtype=float)
+    elements = np.clip(np.searchsorted(node_coords, positions, side='right') - 1, 0, len(node_coords) - 2)
+    le = node_coords[elements + 1] - node_coords[elements]
+    return elements, (positions - node_coords[elements]) / le, le
+
+
+def moment_error_estimate(node_coords, distributed_loads):
+    """ error of the bending moment diagram drawn straight between the nodes,
+    the nodal values are exact but inside an element under a distributed load
+    the moment departs from the line by about its fixed end moments"""
+    error = np.zeros(len(node_coords) - 1)
+    for load_expr, start, end in distributed_loads:
+        elements, nodal_loads = distributed_load_vector(node_coords, load_expr, start, end)
+        np.add.at(error, elements, np.maximum(np.abs(nodal_loads[:, 1]), np.abs(nodal_loads[:, 3])))
+    return error
+
+
+def adaptive_mesh(length, elasticity, inertia, supports, point_loads, distributed_loads, moments, num_elements=10, tolerance=1e-3, max_iterations=20, max_elements=10**6, progress=None):
+    """ start from the load and support aware mesh and bisect the elements whose
+    moment error is above tolerance * max |bending moment| until none is left
+
+    Returns:
+        node coordinates
+    """
+    if np.ndim(np.multiply(elasticity, inertia)) > 0:
+        raise ValueError("Adaptive meshing needs the same E and I for the whole beam")
+    node_coords = generate_mesh(length, num_elements, supports, point_loads, distributed_loads, moments)
+    for _ in range(max_iterations):
+        report_progress(progress, 'refinement')
+        error = moment_error_estimate(node_coords, distributed_loads)
+        if not error.any():
+            break
+        data = perform_analysis_determinate(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments, node_coords=node_coords)
+        refine = error > tolerance * max(np.abs(data['bending_moments']).max(), np.finfo(float).tiny)
+        if not refine.any() or len(node_coords) + refine.sum() > max_elements + 1:
+            break
+        midpoints = (node_coords[:-1][refine] + node_coords[1:][refine]) / 2
+        node_coords = np.sort(np.concatenate([node_coords, midpoints]))
+    return node_coords
+
+
+def assemble_banded(k_elements):
+    """ scatter-add the stacked element matrices into the global stiffness
+    matrix in upper banded storage (BANDWIDTH + 1 rows, one column per DOF)"""
+    num_elements = len(k_elements)
+    ab = np.zeros((BANDWIDTH + 1, 2 * (num_elements + 1)))
+    first_dof = 2 * np.arange(num_elements)
+    for r in range(4):
+        for c in range(r, 4):
+            # every element writes to a different column, so no index repeats here
+            ab[BANDWIDTH + r - c, first_dof + c] += k_elements[:, r, c]
+    return ab
+
+
+def apply_supports_banded(ab, constrained):
+    """ zero the rows and columns of the constrained DOFs (boolean mask)
+    and put a unit on the diagonal, in place"""
+    # row index of every entry in the banded storage
+    rows = np.arange(ab.shape[1]) + np.arange(-BANDWIDTH, 1)[:, None]
+    row_constrained = constrained[np.clip(rows, 0, None)] & (rows >= 0)
+    ab[row_constrained | constrained] = 0
+    ab[BANDWIDTH, constrained] = 1
+
+
+def banded_to_sparse(ab):
+    """ the full symmetric matrix of an upper banded storage as a scipy.sparse matrix"""
+    from scipy import sparse
+    diagonals = [ab[BANDWIDTH]]
+    offsets = [0]
+    for offset in range(1, BANDWIDTH + 1):
+        # dia storage keeps entry (j - offset, j) in column j for both triangles
+        diagonals += [ab[BANDWIDTH - offset], np.roll(ab[BANDWIDTH - offset], -offset)]
+        offsets += [offset, -offset]
+    return sparse.dia_matrix((np.array(diagonals), offsets), shape=(ab.shape[1],) * 2).tocsr()
+
+
+def support_dofs(node_coords, supports):
+    """ boolean mask of the DOFs restrained by the supports
+    ## support_type: 1 - Roller, 2 - Pin, 3 - Fixed ##"""
+    constrained = np.zeros(2 * len(node_coords), dtype=bool)
+    for support_type, position in supports:
+        node_index = nearest_nodes(node_coords, position)
+        if support_type == 3:
+            constrained[[2 * node_index, 2 * node_index + 1]] = True
+        elif support_type == 1 or support_type == 2:
+            constrained[2 * node_index] = True
+        else:
+            raise ValueError("Invalid support type")
+    return constrained
+
+
+def element_load_vectors(node_coords, point_loads, distributed_loads, moments, nodal=True):
+    """ consistent load vector of every element in the sign of the global
+    force vector, shape (n, 4). With nodal=False the point loads and moments
+    sitting on a node are left out, they act on the node and not inside an
+    element (element_end_forces)."""
+    element_loads = np.zeros((len(node_coords) - 1, 4))
+
+    # Apply point loads (consistent nodal loads, exact nodal values when they sit on a node)
+    for loads, shape_functions in ((point_loads, hermite_shape_functions), (moments, hermite_shape_derivatives)):
+        if not len(loads):
+            continue
+        values, positions = np.asarray(loads, dtype=float).T
+        elements, xi, le = locate_in_elements(node_coords, positions)
+        if not nodal:
+            inside = (xi > 0) & (xi < 1)
+            values, elements, xi, le = values[inside], elements[inside], xi[inside], le[inside]
+        np.subtract.at(element_loads, elements, values[:, None] * shape_functions(xi, le))
+
+    # Apply distributed loads (consistent nodal loads, q is a function of x in m)
+    for load_expr, start, end in distributed_loads:
+        elements, nodal_loads = distributed_load_vector(node_coords, load_expr, start, end)
+        np.subtract.at(element_loads, elements, nodal_loads)
+    return element_loads
+
+
+def load_vector(node_coords, point_loads, distributed_loads, moments):
+    """ global force vector of one set of loads"""
+    global_f = np.zeros(2 * len(node_coords))
+    element_loads = element_load_vectors(node_coords, point_loads, distributed_loads, moments)
+    np.add.at(global_f, element_dofs(len(element_loads)), element_loads)
+    return global_f
+
+
+def system_load_vector(system, point_loads=(), distributed_loads=(), moments=()):
+    """ global force vector of one set of loads on the mesh the system was
+    factored on (load_vector, or the fixed end forces of its sections)"""
+    if system.get('sections') is None:
+        return load_vector(system['node_coords'], point_loads, distributed_loads, moments)
+    global_f = np.zeros(2 * len(system['node_coords']))
+    element_loads = section_load_vectors(system, point_loads, distributed_loads, moments)
+    np.add.at(global_f, element_dofs(len(element_loads)), element_loads)
+    return global_f
+
+
+def assemble_system(node_coords, elasticity, inertia, supports, solve_coords=None):
+    """ assemble and factor the stiffness matrix of a beam once so it can be
+    reused for any number of load vectors. Meshes finer than MAX_SOLVE_ELEMENTS
+    are factored on solve_coords (by default the solve_mesh of the supports),
+    recover_nodal_values and sample_diagrams give the results at their nodes.
+    With E or I varying per element every coarse element gets the exact
+    stiffness of the elements it holds, which are kept as system['sections'].
+
+    Returns:
+        dict with the node coordinates (of solve_coords), E*I and matrices of the elements,
+        constrained DOF mask, the banded Cholesky factor and the sections (or None)
+    """
+    node_coords = np.asarray(node_coords, dtype=float)
+    if solve_coords is None:
+        solve_coords = solve_mesh(node_coords, elasticity, inertia, supports)
+    solve_coords = np.asarray(solve_coords, dtype=float)
+    if len(solve_coords) - 1 > MAX_SOLVE_ELEMENTS:
+        raise ValueError(f"A beam of {len(solve_coords) - 1} elements is too fine to be solved accurately (at most "
+                         f"{MAX_SOLVE_ELEMENTS} elements), leave out solve_coords to solve it on a coarser mesh")
+    flexural_rigidity = np.multiply(elasticity, inertia)
+    sections = None
+    if solve_coords is not node_coords:
+        if np.ndim(flexural_rigidity) > 0 and np.ptp(flexural_rigidity) > 0:
+            sections = {'node_coords': node_coords,
+                        'flexural_rigidity': np.broadcast_to(flexural_rigidity, len(node_coords) - 1),
+                        'first': nearest_nodes(node_coords, solve_coords)}
+        else:
+            flexural_rigidity = float(np.ravel(flexural_rigidity)[0])
+
+    profiling.record('num_dofs', 2 * len(solve_coords))
+    with profiling.stage('stiffness'):
+        # Stiffness matrices of all beam elements, E and I may vary per element
+        if sections is None:
+            k_elements = element_stiffness(flexural_rigidity, np.diff(solve_coords))
+        else:
+            k_elements = section_stiffness(sections, solve_coords)
+
+        # Global stiffness matrix assembly (banded, half-bandwidth 3)
+        global_k = assemble_banded(k_elements)
+
+    # Apply support conditions to the stiffness matrix
+    with profiling.stage('supports'):
+        constrained = support_dofs(solve_coords, supports)
+        apply_supports_banded(global_k, constrained)
+
+    with profiling.stage('factorization'):
+        # scipy.linalg takes longer to import than numpy, only load it when solving
+        from scipy.linalg import cholesky_banded
+        factor = cholesky_banded(global_k, lower=False)
+
+    return {
+        'node_coords': solve_coords,
+        # the E*I of elements with sections is in the sections
+        'flexural_rigidity': None if sections is not None else np.broadcast_to(flexural_rigidity, len(solve_coords) - 1),
+        'k_elements': k_elements,
+        'constrained': constrained,
+        'factor': factor,
+        'sections': sections
+    }
+
+
+def solve_system(system, global_f):
+    """ displacements for one load vector (ndof,) or many at once (ndof, k)"""
+    global_f = np.array(global_f, dtype=float)
+    global_f[system['constrained']] = 0
+    from scipy.linalg import cho_solve_banded
+    return cho_solve_banded((system['factor'], False), global_f)
+
+
+def element_end_forces(system, u, element_loads=None):
+    """ element end forces k_e @ u_e - f_e laid out per DOF, each node keeps the
+    start of the element to its right and the last node the end of the last
+    element. f_e are the element_load_vectors(..., nodal=False) of the loads u
+    was solved for, (n, 4) or (n, 4, k) for many load vectors; without them
+    the ends of elements under distributed loads are off by the fixed end
+    forces of those loads."""
+    k_elements = system['k_elements']
+    u_elements = u[element_dofs(len(k_elements))]
+    end_forces = np.einsum('eij,ej...->ei...', k_elements, u_elements)
+    if element_loads is not None:
+        end_forces = end_forces - element_loads
+    return np.concatenate([end_forces[:, :2].reshape((-1,) + u.shape[1:]), end_forces[-1, 2:]])
+
+
+def support_reactions(node_coords, supports, element_forces):
+    """ reaction force (and moment for fixed supports) read from the element forces"""
+    reactions = []
+    for support_type, position in supports:
+        node_index = nearest_nodes(node_coords, position)
+        reaction = {'type': support_type, 'position': position, 'force': element_forces[2 * node_index]}
+        if support_type == 3:
+            reaction['moment'] = element_forces[2 * node_index + 1]
+        reactions.append(reaction)
+    return reactions
+
+
+def element_load_integrals(node_coords, elements, positions, point_loads=(), distributed_loads=(), moments=()):
+    """ I_k(x) = integral of (x - t)^k / k! q(t) dt from the start of the
+    element to x for k = 0..3, where q is the upward load of the element
+    (point loads and moments as delta functions, a load on x counts)
+
+    Returns:
+        (m, 4) array of I_0 .. I_3 for every position
+    """
+    integrals = np.zeros((len(positions), 4))
+    factorials = np.array([1, 1, 2, 6])
+
+    # point loads (down positive) and moments only reach the positions in their element
+    order = np.argsort(elements, kind='stable')
+    sorted_elements = elements[order]
+    for loads, derivative in ((point_loads, 0), (moments, 1)):
+        if not len(loads):
+            continue
+        values, load_positions = np.asarray(loads, dtype=float).T
+        load_elements, _, _ = locate_in_elements(node_coords, load_positions)
+        lo = np.searchsorted(sorted_elements, load_elements, side='left')
+        counts = np.searchsorted(sorted_elements, load_elements, side='right') - lo
+        # (position, load) pairs sharing an element
+        load_index = np.repeat(np.arange(len(values)), counts)
+        position_index = order[np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+        distance = positions[position_index] - load_positions[load_index]
+        reached = distance >= 0
+        for k in range(derivative, 4):
+            # a couple is the derivative of a point load, so it shifts the powers by one
+            term = distance ** (k - derivative) / factorials[k - derivative] * reached
+            np.add.at(integrals[:, k], position_index, (values[load_index] if derivative else -values[load_index]) * term)
+
+    # distributed loads (down positive) between the start of the covered part and x,
+    # (x - t)^k = (-1)^k (t - x)^k
+    x_start = node_coords[elements]
+    for load_expr, start, end in distributed_loads:
+        start, end = sorted((start, end))
+        lo = np.maximum(x_start, start)
+        hi = np.minimum(positions, end)
+        covered = hi > lo
+        if not covered.any():
+            continue
+        moments = load_moments(load_expr, lo[covered], hi[covered], positions[covered])
+        integrals[covered] -= moments * np.array([1, -1, 1, -1]) / factorials
+    return integrals
+
+
+def sample_diagrams(system, u, positions, point_loads=(), distributed_loads=(), moments=()):
+    """ deflection, rotation, bending moment and shear force at any positions,
+    exact inside the elements: the Hermite interpolation of the nodal
+    displacements plus the solution of each element clamped at both ends
+    under its own loads. A coarse mesh (nodes at the supports and loads) with
+    many sample points gives the diagrams of a fine mesh. Distributed loads
+    are integrated with load_moments, so polynomial loads up to degree 4 are
+    exact and smooth ones within LOAD_TOLERANCE.
+    variables:  system, u = assembled system and its displacements
+                positions = positions along the beam (m)
+                point_loads, distributed_loads, moments = the loads u was solved for
+
+    Returns:
+        dict with the positions and the deflections, rotations, bending_moments
+        and shear_forces there, in the sign convention of plots_data
+    """
+    if system.get('sections') is not None:
+        return section_diagrams(system, u, positions, point_loads, distributed_loads, moments)
+    node_coords = system['node_coords']
+    positions = np.asarray(positions, dtype=float)
+    elements, xi, le = locate_in_elements(node_coords, positions)
+    flexural_rigidity = system['flexural_rigidity'][elements]
+    u_elements = u[element_dofs(len(node_coords) - 1)[elements]]
+
+    # particular solution v0 = I_3 / EI, corrected to zero deflection and slope at the element end
+    inside = element_load_integrals(node_coords, elements, positions, point_loads, distributed_loads, moments)
+    # once per element, many positions share one
+    unique_elements, element_index = np.unique(elements, return_inverse=True)
+    at_end = element_load_integrals(node_coords, unique_elements, node_coords[unique_elements + 1], point_loads, distributed_loads, moments)[element_index]
+    end_values = np.stack([at_end[:, 3], at_end[:, 2]], axis=-1) / flexural_rigidity[:, None]
+
+    derivatives = []
+    for order in range(4):
+        shape = hermite_shape_functions(xi, le) if order == 0 else hermite_shape_derivatives(xi, le, order)
+        particular = inside[:, 3 - order] / flexural_rigidity - np.sum(shape[:, 2:] * end_values, axis=1)
+        derivatives.append(np.sum(shape * u_elements, axis=1) + particular)
+    return {
+        'positions': positions,
+        'deflections': derivatives[0],
+        'rotations': derivatives[1],
+        'bending_moments': -flexural_rigidity * derivatives[2],
+        'shear_forces': flexural_rigidity * derivatives[3]
+    }
+
+
+def segment_cumsum(values, counts):
+    """ cumulative sums along the rows of values, starting again at every
+    segment of counts rows"""
+    total = np.cumsum(values, axis=0)
+    before = np.concatenate([np.zeros((1,) + values.shape[1:]), total[np.cumsum(counts)[:-1] - 1]])
+    return total - np.repeat(before, counts, axis=0)
+
+
+def section_integrals(sections, solve_coords, elements, point_loads=(), distributed_loads=(), moments=()):
+    """ curvature integrals over the sections (finer elements, each with its
+    own E*I) of the given elements of solve_coords. In an element starting
+    at a, with M_a and V_a the moment and shear its start carries,
+
+        EI(x) v''(x) = -M_a + V_a (x - a) + I_1(x)
+
+    (I_k of element_load_integrals), so the rotation and the deflection are
+    sums of T_k(x) = integral of kappa_k and W_k(x) = integral of (x - t) kappa_k(t)
+    from a to x, for kappa_k = 1 / EI, (x - a) / EI and I_1 / EI. The sums run
+    section by section, they only add up positive flexibilities and do not
+    suffer from the conditioning of a fine stiffness matrix.
+
+    Returns:
+        dict with the sections of the elements (fine) and T, W (m, 3) and the
+        load integrals I (m, 4) at their starts, T, W, I at the end of every
+        element (end_T, end_W, end_I) and its flexibility, the integrals of
+        1, s and s^2 over E*I (flexibility, (n, 3))
+    """
+    x, first = sections['node_coords'], sections['first']
+    counts = first[elements + 1] - first[elements]
+    starts = np.cumsum(counts) - counts
+    fine = np.repeat(first[elements], counts) + np.arange(counts.sum()) - np.repeat(starts, counts)
+    owner = np.repeat(elements, counts)
+    h = x[fine + 1] - x[fine]
+    s = x[fine] - solve_coords[owner]
+    flexural_rigidity = sections['flexural_rigidity'][fine, None]
+
+    # load integrals at the start of every section and at the end of every element
+    integrals = element_load_integrals(solve_coords, np.concatenate([owner, elements]),
+                                       np.concatenate([x[fine], solve_coords[elements + 1]]), point_loads, distributed_loads, moments)
+    start_I, end_I = integrals[:len(fine)], integrals[len(fine):]
+    last = starts + counts - 1
+    next_I = np.roll(start_I, -1, axis=0)
+    next_I[last] = end_I
+
+    # integrals over one section, E*I is constant there
+    A = np.stack([h, h * (s + h / 2), next_I[:, 2] - start_I[:, 2]], axis=-1) / flexural_rigidity
+    B = np.stack([h**2 / 2, s * h**2 / 2 + h**3 / 6, next_I[:, 3] - start_I[:, 3] - h * start_I[:, 2]], axis=-1) / flexural_rigidity
+    T = segment_cumsum(A, counts) - A
+    step = T * h[:, None] + B
+    W = segment_cumsum(step, counts) - step
+    # sums of positive terms only, the stiffness is built from them
+    midpoint = s + h / 2
+    flexibility = np.add.reduceat(np.stack([h, h * midpoint, h * (midpoint**2 + h**2 / 12)], axis=-1) / flexural_rigidity, starts)
+    return {'fine': fine, 'T': T, 'W': W, 'I': start_I,
+            'end_T': T[last] + A[last], 'end_W': W[last] + step[last], 'end_I': end_I, 'flexibility': flexibility}
+
+
+def section_matrices(element_lengths, flexibility):
+    """ the start moment and shear of elements with sections are
+    inverse @ (R @ u_e - load terms), their end forces (element_end_forces
+    layout) ends @ (M_a, V_a) plus the loads reaching the end
+
+    Returns:
+        (inverse (n, 2, 2), R (n, 2, 4), ends (n, 4, 2))
+    """
+    le = np.asarray(element_lengths, dtype=float)
+    zero, one = np.zeros_like(le), np.ones_like(le)
+    # rotation and deflection gained over the element per unit M_a and V_a,
+    # with integral of (L - s) / EI = L F_0 - F_1 the stiffness stays symmetric
+    F_0, F_1, F_2 = flexibility.T
+    flexibility = np.stack([np.stack([-F_0, F_1], axis=-1),
+                            np.stack([F_1 - le * F_0, le * F_1 - F_2], axis=-1)], axis=1)
+    R = np.stack([np.stack([zero, -one, zero, one], axis=-1),
+                  np.stack([-one, -le, one, zero], axis=-1)], axis=1)
+    ends = np.stack([np.stack([zero, one], axis=-1), np.stack([one, zero], axis=-1),
+                     np.stack([zero, -one], axis=-1), np.stack([-one, le], axis=-1)], axis=1)
+    return np.linalg.inv(flexibility), R, ends
+
+
+def section_stiffness(sections, solve_coords):
+    """ exact stiffness of every element of solve_coords over its sections,
+    stacked into a (n, 4, 4) array like element_stiffness"""
+    integrals = section_integrals(sections, solve_coords, np.arange(len(solve_coords) - 1))
+    inverse, R, ends = section_matrices(np.diff(solve_coords), integrals['flexibility'])
+    return ends @ inverse @ R
+
+
+def section_load_vectors(system, point_loads=(), distributed_loads=(), moments=()):
+    """ fixed end forces of every element of a system with sections, in the
+    sign of the global force vector, shape (n, 4). Loads on a node belong to
+    the element starting there (the last one for the end of the beam)."""
+    solve_coords = system['node_coords']
+    integrals = section_integrals(system['sections'], solve_coords, np.arange(len(solve_coords) - 1),
+                                  point_loads, distributed_loads, moments)
+    inverse, _, ends = section_matrices(np.diff(solve_coords), integrals['flexibility'])
+    load_terms = np.stack([integrals['end_T'][:, 2], integrals['end_W'][:, 2]], axis=-1)
+    end_I = integrals['end_I']
+    reaching = np.stack([np.zeros(len(end_I)), np.zeros(len(end_I)), -end_I[:, 0], end_I[:, 1]], axis=-1)
+    return np.einsum('eij,ejk,ek->ei', ends, inverse, load_terms) - reaching
+
+
+def section_diagrams(system, u, positions, point_loads=(), distributed_loads=(), moments=()):
+    """ sample_diagrams of a system with sections: the start moment and
+    shear of every element from its end displacements, then the curvature
+    integrated section by section up to the positions (section_integrals).
+    Only the elements holding a position are integrated."""
+    solve_coords, sections = system['node_coords'], system['sections']
+    positions = np.asarray(positions, dtype=float)
+    fine_elements, _, _ = locate_in_elements(sections['node_coords'], positions)
+    owner = np.searchsorted(sections['first'], fine_elements, side='right') - 1
+    elements, index = np.unique(owner, return_inverse=True)
+    integrals = section_integrals(sections, solve_coords, elements, point_loads, distributed_loads, moments)
+
+    # start moment and shear of every element
+    inverse, R, ends = section_matrices(np.diff(solve_coords)[elements], integrals['flexibility'])
+    u_elements = u[element_dofs(len(solve_coords) - 1)[elements]]
+    load_terms = np.stack([integrals['end_T'][:, 2], integrals['end_W'][:, 2]], axis=-1)
+    M_a, V_a = np.einsum('eij,ej->ei', inverse, np.einsum('eij,ej->ei', R, u_elements) - load_terms)[index].T
+    v_a, theta_a = u_elements[index, 0], u_elements[index, 1]
+
+    # from the start of the section holding each position on
+    row = np.searchsorted(integrals['fine'], fine_elements)
+    start_T, start_W, start_I = integrals['T'][row], integrals['W'][row], integrals['I'][row]
+    flexural_rigidity = sections['flexural_rigidity'][fine_elements]
+    d = positions - sections['node_coords'][fine_elements]
+    s = positions - solve_coords[elements][index]
+    inside = element_load_integrals(solve_coords, owner, positions, point_loads, distributed_loads, moments)
+    A = np.stack([d, d * (s - d / 2), inside[:, 2] - start_I[:, 2]], axis=-1) / flexural_rigidity[:, None]
+    B = np.stack([d**2 / 2, (s - d) * d**2 / 2 + d**3 / 6, inside[:, 3] - start_I[:, 3] - d * start_I[:, 2]], axis=-1) / flexural_rigidity[:, None]
+    T = start_T + A
+    W = start_W + d[:, None] * start_T + B
+    return {
+        'positions': positions,
+        'deflections': v_a + theta_a * s - M_a * W[:, 0] + V_a * W[:, 1] + W[:, 2],
+        'rotations': theta_a - M_a * T[:, 0] + V_a * T[:, 1] + T[:, 2],
+        'bending_moments': M_a - V_a * s - inside[:, 1],
+        'shear_forces': V_a + inside[:, 0]
+    }
+
+
+def solve_mesh(node_coords, elasticity, inertia, supports=(), point_loads=(), distributed_loads=(), moments=(), max_elements=MAX_SOLVE_ELEMENTS):
+    """ the mesh assemble_system factors the stiffness of node_coords on:
+    node_coords itself up to max_elements elements, a load and support
+    aware mesh of RECOVERY_ELEMENTS elements beyond. With E or I varying per
+    element the coarse nodes are the nodes of node_coords closest to that
+    mesh, every coarse element then holds whole elements (its sections).
+
+    Returns:
+        node coordinates
+    """
+    if len(node_coords) - 1 <= max_elements:
+        return node_coords
+    coarse_coords = generate_mesh(node_coords[-1], RECOVERY_ELEMENTS, supports, point_loads, distributed_loads, moments)
+    flexural_rigidity = np.multiply(elasticity, inertia)
+    if np.ndim(flexural_rigidity) > 0 and np.ptp(flexural_rigidity) > 0:
+        return node_coords[np.unique(nearest_nodes(node_coords, coarse_coords))]
+    return coarse_coords
+
+
+def nodal_diagrams(system, u, node_coords, point_loads=(), distributed_loads=(), moments=(), start=0, stop=None):
+    """ sample_diagrams at the nodes start..stop-1 (all by default) of a
+    finer mesh in the node layout of plots_data: the last node keeps the end
+    of the last element, the loads on the end act on the node and the forces
+    have the signs of the element end
+
+    Returns:
+        dict as sample_diagrams
+    """
+    stop = len(node_coords) if stop is None else stop
+    samples = sample_diagrams(system, u, node_coords[start:stop], point_loads, distributed_loads, moments)
+    if stop == len(node_coords) and stop > start:
+        length = system['node_coords'][-1]
+        end = sample_diagrams(system, u, node_coords[-1:], [load for load in point_loads if load[1] < length],
+                              distributed_loads, [load for load in moments if load[1] < length])
+        samples['shear_forces'][-1] = -end['shear_forces'][0]
+        samples['bending_moments'][-1] = -end['bending_moments'][0]
+    return samples
+
+
+def recover_nodal_values(system, u, node_coords, point_loads=(), distributed_loads=(), moments=()):
+    """ end forces (laid out as element_end_forces) and deflections at the
+    nodes of a finer mesh from the solution u of a coarse system, with
+    sample_diagrams which is exact at any position
+
+    Returns:
+        (element_forces, deflections)
+    """
+    samples = nodal_diagrams(system, u, node_coords, point_loads, distributed_loads, moments)
+    element_forces = np.empty(2 * len(node_coords))
+    element_forces[0::2] = samples['shear_forces']
+    element_forces[1::2] = samples['bending_moments']
+    return element_forces, samples['deflections']
+
+
+def build_mesh(length, elasticity, inertia, num_elements, supports=(), point_loads=(), distributed_loads=(), moments=()):
+    """ default mesh of an analysis: uniform when E or I are given per element
+    (the values belong to those elements), load and support aware otherwise"""
+    return segment_nodes(*mesh_segments(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments))
+
+
+def mesh_segments(length, elasticity, inertia, num_elements, supports=(), point_loads=(), distributed_loads=(), moments=()):
+    """ the mesh of build_mesh as its key positions and the number of
+    elements between them (segment_nodes gives the nodes)
+
+    Returns:
+        (keys, counts)
+    """
+    if np.ndim(np.multiply(elasticity, inertia)) > 0:
+        return np.array([0.0, float(length)]), np.array([num_elements])
+    keys = key_positions(length, supports, point_loads, distributed_loads, moments, 1e-3 * length / num_elements)
+    return keys, segment_counts(keys, num_elements)
+
+
+def report_progress(progress, stage):
+    """ tell the optional progress callback which stage starts, the callback
+    may raise to cancel the analysis"""
+    if progress is not None:
+        progress(stage)
+
+
+def perform_analysis_determinate(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments, node_coords=None, tolerance=None, progress=None, sample_points=None):
+    """ this function will perform the analysis of the beam
+    and return the shear force and bending moment diagrams
+    as well as the deflection of the beam.
+    variables:  length = length of the beam (m)
+                elasticity = elasticity of the beam (Pa), scalar or one value per element
+                inertia = inertia of the beam (m^4), scalar or one value per element
+                supports = list of supports (type, position)
+                point_loads = list of point loads (force, position)
+                distributed_loads = list of distributed loads (function of x, start, end)
+                moments = list of moments (moment, position)
+                node_coords = optional mesh (sorted node positions), by default num_elements
+                              elements with nodes at every support and load position.
+                              Meshes finer than MAX_SOLVE_ELEMENTS are solved on a coarse
+                              mesh and the results recovered at their nodes (solve_mesh)
+                tolerance = optional relative moment error, refines the mesh adaptively
+                progress = optional callback progress(stage name) called between stages
+                sample_points = optional positions (m), or a number of evenly spaced
+                                positions, where the diagrams are evaluated inside the
+                                elements and returned as plots_data['samples']
+
+    Returns:
+        Array of shear forces along the beam.
+    """
+
+    with profiling.profile('calculator_two') as profile:
+        report_progress(progress, 'meshing')
+        with profiling.stage('meshing'):
+            if node_coords is None and tolerance is not None:
+                node_coords = adaptive_mesh(length, elasticity, inertia, supports, point_loads, distributed_loads, moments, num_elements, tolerance, progress=progress)
+            elif node_coords is None:
+                node_coords = build_mesh(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments)
+            node_coords = np.asarray(node_coords, dtype=float)
+            solve_coords = solve_mesh(node_coords, elasticity, inertia, supports, point_loads, distributed_loads, moments)
+        report_progress(progress, 'assembly')
+        with profiling.stage('assembly'):
+            system = assemble_system(node_coords, elasticity, inertia, supports, solve_coords)
+
+        # Force vector assembly
+        report_progress(progress, 'loads')
+        with profiling.stage('loads'):
+            global_f = system_load_vector(system, point_loads, distributed_loads, moments)
+
+        # Solve for displacements
+        report_progress(progress, 'solve')
+        with profiling.stage('solve'):
+            u = solve_system(system, global_f)
+
+        # Calculate element forces
+        report_progress(progress, 'post-processing')
+        with profiling.stage('post-processing'):
+            if solve_coords is node_coords:
+                element_loads = element_load_vectors(node_coords, point_loads, distributed_loads, moments, nodal=False)
+                element_forces = element_end_forces(system, u, element_loads)
+                deflections = u[::2]
+            else:
+                element_forces, deflections = recover_nodal_values(system, u, node_coords, point_loads, distributed_loads, moments)
+
+            plots_data = {
+                'node_coords': node_coords,
+                'shear_forces': element_forces[0::2],
+                'bending_moments': element_forces[1::2],
+                'deflections': deflections,
+                'support_reactions': support_reactions(node_coords, supports, element_forces)
+            }
+            if sample_points is not None:
+                if np.ndim(sample_points) == 0:
+                    sample_points = np.linspace(0, length, int(sample_points))
+                plots_data['samples'] = sample_diagrams(system, u, sample_points, point_loads, distributed_loads, moments)
+    # only with BEAM_PROFILE set, see profiling.py
+    if profile is not None:
+        plots_data['timings'] = profile.summary()
+    return plots_data
+
+
+def analyze_model(model, elasticity, inertia, num_elements, **options):
+    """ perform_analysis_determinate for a beam_model.BeamModel, options are
+    passed through (node_coords, tolerance, progress)"""
+    return perform_analysis_determinate(model.length, elasticity, inertia, num_elements, model.supports,
+                                        model.point_loads, model.distributed_loads, model.moments, **options)
+
+
+def perform_analysis_load_cases(length, elasticity, inertia, num_elements, supports, load_cases, combinations=None):
+    """ analyse one beam under many load cases with a single assembly and
+    factorization, all right-hand sides are solved together.
+    variables:  length, elasticity, inertia, num_elements, supports = as in perform_analysis_determinate
+                load_cases = list of dicts with 'name' and any of 'point_loads',
+                             'distributed_loads' and 'moments' (same tuple formats)
+                combinations = optional list of dicts {'name': ..., 'factors': {case name: factor}},
+                               when given the combinations are reported instead of the cases
+
+    Returns:
+        dict with node_coords, the case names, (cases, nodes) arrays of shear forces,
+        bending moments and deflections, the support reactions of every case
+        and the max/min envelopes of the three diagrams
+    """
+    # one mesh with a node at every load position of every case
+    node_coords = build_mesh(length, elasticity, inertia, num_elements, supports,
+                             [load for case in load_cases for load in case.get('point_loads', [])],
+                             [load for case in load_cases for load in case.get('distributed_loads', [])],
+                             [load for case in load_cases for load in case.get('moments', [])])
+    solve_coords = solve_mesh(node_coords, elasticity, inertia, supports,
+                              [load for case in load_cases for load in case.get('point_loads', [])],
+                              [load for case in load_cases for load in case.get('distributed_loads', [])],
+                              [load for case in load_cases for load in case.get('moments', [])])
+    system = assemble_system(node_coords, elasticity, inertia, supports, solve_coords)
+
+    names = [case.get('name', f'case_{i}') for i, case in enumerate(load_cases)]
+    case_loads = [(case.get('point_loads', []), case.get('distributed_loads', []), case.get('moments', [])) for case in load_cases]
+    u = solve_system(system, np.column_stack([system_load_vector(system, *loads) for loads in case_loads]))
+    if solve_coords is node_coords:
+        element_loads = np.stack([element_load_vectors(node_coords, *loads, nodal=False) for loads in case_loads], axis=-1)
+        element_forces = element_end_forces(system, u, element_loads)
+        deflections = u[::2]
+    else:
+        recovered = [recover_nodal_values(system, u[:, j], node_coords, *loads) for j, loads in enumerate(case_loads)]
+        element_forces = np.column_stack([forces for forces, _ in recovered])
+        deflections = np.column_stack([values for _, values in recovered])
+
+    # the response is linear, so combinations are just factored cases
+    if combinations is not None:
+        factors = np.zeros((len(load_cases), len(combinations)))
+        for j, combination in enumerate(combinations):
+            for case, factor in combination['factors'].items():
+                factors[case if isinstance(case, int) else names.index(case), j] = factor
+        element_forces = element_forces @ factors
+        deflections = deflections @ factors
+        names = [combination.get('name', f'combination_{j}') for j, combination in enumerate(combinations)]
+
+    results = {
+        'node_coords': node_coords,
+        'names': names,
+        'shear_forces': element_forces[0::2].T,
+        'bending_moments': element_forces[1::2].T,
+        'deflections': deflections.T,
+        'support_reactions': [support_reactions(node_coords, supports, element_forces[:, j]) for j in range(len(names))]
+    }
+    results['envelopes'] = {key: {'max': results[key].max(axis=0), 'min': results[key].min(axis=0)}
+                            for key in ('shear_forces', 'bending_moments', 'deflections')}
+    return results
+
+
+RESPONSES = ('shear_forces', 'bending_moments', 'deflections')
+
+# modal_analysis solves on at most this many elements per mode (and at least
+# MIN_MODAL_ELEMENTS), finer meshes only add roundoff to the frequencies
+MODAL_ELEMENTS_PER_MODE = 40
+MIN_MODAL_ELEMENTS = 200
+
+
+def response_functionals(system, section_nodes, response):
+    """ columns c with c @ u equal to the plots_data response at the section nodes,
+    shape (ndof, sections)"""
+    k_elements = system['k_elements']
+    num_elements = len(k_elements)
+    section_nodes = np.asarray(section_nodes)
+    functionals = np.zeros((2 * (num_elements + 1), len(section_nodes)))
+    columns = np.arange(len(section_nodes))
+    if response == 'deflections':
+        functionals[2 * section_nodes, columns] = 1
+        return functionals
+    # shear and moment come from k_e @ u_e of the element right of the node
+    # (the last node uses the end of the last element)
+    row = RESPONSES.index(response)
+    element = np.minimum(section_nodes, num_elements - 1)
+    row = row + 2 * (section_nodes == num_elements)
+    dofs = element_dofs(num_elements)[element]
+    functionals[dofs, columns[:, None]] = k_elements[element, row]
+    return functionals
+
+
+def influence_lines(length, elasticity, inertia, num_elements, supports, sections, responses=RESPONSES, system=None):
+    """ influence lines of the responses at the chosen sections for a unit
+    (downward, +1) point load standing at every node. By reciprocity one solve
+    per section replaces one full analysis per load position: the line is
+    minus the deflection of the beam under the response functional (the
+    adjoint), sampled at the nodes with sample_diagrams, so meshes finer than
+    MAX_SOLVE_ELEMENTS are solved on their solve_mesh.
+    variables:  sections = list of positions (m) where the responses are wanted
+                responses = any of 'shear_forces', 'bending_moments', 'deflections'
+                system = optional assembled system, the lines are then given at its nodes
+
+    Returns:
+        dict with node_coords, the section positions and one (sections, nodes)
+        array per response
+    """
+    if system is None:
+        section_loads = [(0, position) for position in sections]
+        node_coords = build_mesh(length, elasticity, inertia, num_elements, supports, section_loads)
+        system = assemble_system(node_coords, elasticity, inertia, supports,
+                                 solve_mesh(node_coords, elasticity, inertia, supports, section_loads))
+    else:
+        node_coords = system['node_coords']
+    solve_coords = system['node_coords']
+    num_elements = len(solve_coords) - 1
+    section_nodes = nearest_nodes(solve_coords, np.asarray(sections, dtype=float))
+
+    # adjoint solve: the response to f is (K^-1 c) @ f and a unit load puts -1 in f
+    functionals = np.hstack([response_functionals(system, section_nodes, response) for response in responses])
+    adjoint = solve_system(system, functionals)
+    lines = np.stack([-sample_diagrams(system, column, node_coords)['deflections'] for column in adjoint.T])
+
+    # a load inside the element right of a section is also in its end forces:
+    # its share is the deflection there under a unit end displacement
+    elements, xi, _ = locate_in_elements(solve_coords, node_coords)
+    for j, response in enumerate(responses):
+        if response == 'deflections':
+            continue
+        for i, node in enumerate(section_nodes):
+            element = min(node, num_elements - 1)
+            inside = (elements == element) & (xi > 0) & (xi < 1)
+            if not inside.any():
+                continue
+            unit = np.zeros(2 * (num_elements + 1))
+            unit[element_dofs(num_elements)[element, RESPONSES.index(response) + 2 * (node == num_elements)]] = 1
+            lines[j * len(section_nodes) + i, inside] += sample_diagrams(system, unit, node_coords[inside])['deflections']
+
+    results = {'node_coords': node_coords, 'sections': solve_coords[section_nodes]}
+    results.update(zip(responses, lines.reshape(len(responses), len(section_nodes), len(node_coords))))
+    return results
+
+
+def moving_load_analysis(length, elasticity, inertia, num_elements, supports, sections, axle_loads, axle_spacings=(), positions=None, responses=RESPONSES):
+    """ responses at the sections while a train of axle loads crosses the beam,
+    evaluated from the influence lines for every position at once.
+    variables:  axle_loads = list of axle forces, the first one leads
+                axle_spacings = distances between consecutive axles (m)
+                positions = positions of the leading axle (m), by default the
+                            whole train crosses the beam in element sized steps
+
+    Returns:
+        dict with the positions and, per response, the (sections, positions)
+        history with its max/min envelope and the critical lead axle positions
+    """
+    lines = influence_lines(length, elasticity, inertia, num_elements, supports, sections, responses)
+    node_coords = lines['node_coords']
+    axle_loads = np.asarray(axle_loads, dtype=float)
+    offsets = np.concatenate([[0.0], np.cumsum(axle_spacings)])
+    if positions is None:
+        step = length / num_elements
+        positions = np.arange(0, length + offsets[-1] + step / 2, step)
+    positions = np.asarray(positions, dtype=float)
+    axle_positions = positions[:, None] - offsets
+
+    results = {'sections': lines['sections'], 'positions': positions}
+    for response in responses:
+        # axles off the beam contribute nothing
+        history = np.stack([np.interp(axle_positions, node_coords, line, left=0, right=0) @ axle_loads
+                            for line in lines[response]])
+        results[response] = {
+            'history': history,
+            'max': history.max(axis=1),
+            'min': history.min(axis=1),
+            'max_position': positions[history.argmax(axis=1)],
+            'min_position': positions[history.argmin(axis=1)]
+        }
+    return results
+
+
+def modal_analysis(length, elasticity, inertia, mass_per_length, num_elements, supports, num_modes=10, node_coords=None, shift=0.0):
+    """ lowest natural frequencies and mode shapes of the beam (free vibration,
+    consistent mass matrix). Only num_modes modes are computed, by Lanczos
+    iterations (scipy eigsh) on the banded Cholesky factor of K - shift * M.
+    The smallest eigenvalues of a fine mesh are lost in the roundoff of the
+    factorization (K grows with num_elements^4), so with one E, I and mass the
+    modes are solved on a mesh of MODAL_ELEMENTS_PER_MODE elements per mode and
+    the shapes are interpolated with the Hermite shape functions at the nodes.
+    Values given per element stay on their mesh, which is limited to
+    MAX_SOLVE_ELEMENTS elements (ValueError) unless they are all the same.
+    variables:  length, elasticity, inertia, num_elements, supports = as in perform_analysis_determinate
+                mass_per_length = mass of the beam per metre (kg/m), scalar or one value per element
+                num_modes = number of modes, starting from the lowest frequency
+                node_coords = optional mesh (sorted node positions) of the mode shapes
+                shift = the modes closest to this omega^2 are found, a negative value
+                        lets a beam without enough supports (rigid body modes) factor
+
+    Returns:
+        dict with node_coords, the frequencies (Hz) and angular_frequencies (rad/s) in
+        ascending order, and (modes, nodes) arrays of the mode_shapes (deflections,
+        largest value 1) and their rotations, in the node layout of plots_data
+    """
+    with profiling.profile('calculator_two.modal') as profile:
+        with profiling.stage('meshing'):
+            flexural_rigidity = np.multiply(elasticity, inertia)
+            # arrays holding one value are not really given per element
+            if np.ndim(flexural_rigidity) > 0 and np.ptp(flexural_rigidity) == 0:
+                flexural_rigidity = float(np.ravel(flexural_rigidity)[0])
+            if np.ndim(mass_per_length) > 0 and np.ptp(mass_per_length) == 0:
+                mass_per_length = float(np.ravel(mass_per_length)[0])
+            varying = np.ndim(flexural_rigidity) > 0 or np.ndim(mass_per_length) > 0
+            if node_coords is None and varying:
+                node_coords = np.linspace(0, length, num_elements + 1)
+            elif node_coords is None:
+                node_coords = build_mesh(length, elasticity, inertia, num_elements, supports)
+            node_coords = np.asarray(node_coords, dtype=float)
+            if varying and len(node_coords) - 1 > MAX_SOLVE_ELEMENTS:
+                raise ValueError(f"E, I and mass given per element are limited to {MAX_SOLVE_ELEMENTS} elements, "
+                                 f"the lowest modes are lost in the roundoff beyond ({len(node_coords) - 1} given)")
+            # values per element belong to the elements of the requested mesh
+            solve_coords = node_coords
+            modal_elements = max(MIN_MODAL_ELEMENTS, MODAL_ELEMENTS_PER_MODE * num_modes)
+            if not varying and len(node_coords) - 1 > modal_elements:
+                solve_coords = build_mesh(length, flexural_rigidity, 1.0, modal_elements, supports)
+        num_dofs = 2 * len(solve_coords)
+        profiling.record('num_dofs', num_dofs)
+
+        with profiling.stage('assembly'):
+            element_lengths = np.diff(solve_coords)
+            global_k = assemble_banded(element_stiffness(flexural_rigidity, element_lengths))
+            global_m = assemble_banded(element_mass(mass_per_length, element_lengths))
+            # the constrained DOFs keep a unit stiffness and no mass, the operator
+            # below never leaves the free DOFs so they do not show up as modes
+            constrained = support_dofs(solve_coords, supports)
+            apply_supports_banded(global_k, constrained)
+            apply_supports_banded(global_m, constrained)
+            global_m[BANDWIDTH, constrained] = 0
+
+        with profiling.stage('factorization'):
+            from scipy.linalg import cholesky_banded, cho_solve_banded
+            from scipy.sparse.linalg import LinearOperator, eigsh
+            shifted = global_k - shift * global_m
+            shifted[BANDWIDTH, constrained] = 1
+            factor = cholesky_banded(shifted, lower=False)
+
+        def solve(x):
+            u = cho_solve_banded((factor, False), np.ravel(x))
+            u[constrained] = 0
+            return u
+
+        with profiling.stage('eigensolver'):
+            num_modes = min(num_modes, int((~constrained).sum()) - 1)
+            eigenvalues, vectors = eigsh(banded_to_sparse(global_k), num_modes, M=banded_to_sparse(global_m), sigma=shift,
+                                         which='LM', OPinv=LinearOperator((num_dofs, num_dofs), matvec=solve, dtype=float))
+
+        with profiling.stage('post-processing'):
+            order = np.argsort(eigenvalues)
+            eigenvalues, vectors = eigenvalues[order], vectors[:, order]
+            if solve_coords is node_coords:
+                deflections, rotations = vectors[::2], vectors[1::2]
+            else:
+                elements, xi, le = locate_in_elements(solve_coords, node_coords)
+                u_elements = vectors[element_dofs(len(solve_coords) - 1)[elements]]
+                deflections = np.einsum('nj,njk->nk', hermite_shape_functions(xi, le), u_elements)
+                rotations = np.einsum('nj,njk->nk', hermite_shape_derivatives(xi, le), u_elements)
+            # scale every mode to a largest deflection of +1
+            peaks = deflections[np.abs(deflections).argmax(axis=0), np.arange(num_modes)]
+            peaks = np.where(peaks == 0, 1, peaks)
+            angular_frequencies = np.sqrt(np.maximum(eigenvalues, 0))
+            results = {
+                'node_coords': node_coords,
+                'angular_frequencies': angular_frequencies,
+                'frequencies': angular_frequencies / (2 * np.pi),
+                'mode_shapes': (deflections / peaks).T,
+                'rotations': (rotations / peaks).T
+            }
+    if profile is not None:
+        results['timings'] = profile.summary()
+    return results
@@ -0,0 +1,37 @@
+##Peak preserving downsampling of diagrams for plotting
+import numpy as np
+
+
+def downsample_min_max(x, y, num_bins):
+    """ reduce a line to at most 4 points per bin (the first, last, lowest
+    and highest point of every bin of equal x width), so a diagram drawn
+    num_bins pixels wide looks the same as the full line and keeps every
+    peak value
+    variables:  x = sorted positions
+                y = values at x
+                num_bins = number of bins, normally the plot width in pixels
+
+    Returns:
+        (x, y) of the kept points, in their original order
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    num_bins = max(int(num_bins), 1)
+    if len(x) <= 4 * num_bins or x[-1] <= x[0]:
+        return x, y
+
+    # first index of every non empty bin
+    edges = np.linspace(x[0], x[-1], num_bins + 1)[:-1]
+    starts = np.unique(np.searchsorted(x, edges))
+    ends = np.append(starts[1:], len(x))
+    bins = np.repeat(np.arange(len(starts)), ends - starts)
+
+    indices = [starts, ends - 1]
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        # the first point of every bin that reaches its extreme
+        candidates = np.flatnonzero(y == extreme[bins])
+        first = np.concatenate([[True], np.diff(bins[candidates]) != 0])
+        indices.append(candidates[first])
+    kept = np.unique(np.concatenate(indices))
+    return x[kept], y[kept]
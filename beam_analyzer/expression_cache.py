@@ -0,0 +1,124 @@
+##Memoized symbolic to numeric compilation of distributed load expressions
+from collections import OrderedDict
+
+import sympy as sp
+
+x = sp.Symbol('x')
+
+
+class LRUCache:
+    """ small bounded mapping that drops the least recently used entry
+    and counts hits and misses"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, compute):
+        """ value stored under key, computed (and stored) on a miss"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = self._data[key] = compute()
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+
+class CompiledExpression:
+    """ a parsed load expression q(x) with its antiderivative, the
+    antiderivative of x*q(x) and numeric (NumPy) versions of all three,
+    new bounds are then only substituted instead of integrated"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.antiderivative = sp.integrate(expression, x)
+        self.moment_antiderivative = sp.integrate(x * expression, x)
+        # unevaluated integrals can't be reused for other bounds
+        self.closed_form = not (self.antiderivative.has(sp.Integral) or self.moment_antiderivative.has(sp.Integral))
+        # numeric forms only exist when x is the only symbol
+        self.numeric = expression.free_symbols <= {x}
+        if self.numeric:
+            self.function = sp.lambdify(x, expression, 'numpy')
+            self.numeric_antiderivative = sp.lambdify(x, self.antiderivative, 'numpy')
+            self.numeric_moment_antiderivative = sp.lambdify(x, self.moment_antiderivative, 'numpy')
+        # q, its antiderivative, the antiderivative of that ... grown on demand
+        self.nested = [expression, self.antiderivative]
+        self.numeric_nested = []
+
+    def integrals(self, start, end):
+        """ resultant and first moment (about x = 0) of the load between the bounds"""
+        if not self.closed_form:
+            return (sp.integrate(self.expression, (x, start, end)),
+                    sp.integrate(x * self.expression, (x, start, end)))
+        return (self.antiderivative.subs(x, end) - self.antiderivative.subs(x, start),
+                self.moment_antiderivative.subs(x, end) - self.moment_antiderivative.subs(x, start))
+
+    def nested_antiderivatives(self, order):
+        """ NumPy functions of q and its repeated antiderivatives up to order
+        (Q_0 = q, Q_k' = Q_k-1, all constants zero), None without a closed form"""
+        if not self.numeric:
+            return None
+        while len(self.nested) <= order:
+            self.nested.append(sp.integrate(self.nested[-1], x))
+        if any(expression.has(sp.Integral) for expression in self.nested[:order + 1]):
+            return None
+        while len(self.numeric_nested) <= order:
+            self.numeric_nested.append(sp.lambdify(x, self.nested[len(self.numeric_nested)], 'numpy'))
+        return self.numeric_nested[:order + 1]
+
+    def numeric_integrals(self, start, end):
+        """ integrals() as floats from the lambdified antiderivatives"""
+        if not (self.numeric and self.closed_form):
+            return tuple(float(value) for value in self.integrals(start, end))
+        return (float(self.numeric_antiderivative(end) - self.numeric_antiderivative(start)),
+                float(self.numeric_moment_antiderivative(end) - self.numeric_moment_antiderivative(start)))
+
+
+_parsed = LRUCache(1024)
+_compiled = LRUCache(256)
+_integrals = LRUCache(4096)
+
+
+def parse(load_expr):
+    """ sympy expression of a load given as a string (or already parsed)"""
+    if isinstance(load_expr, sp.Basic):
+        return load_expr
+    return _parsed.get(load_expr, lambda: sp.sympify(load_expr))
+
+
+def compile_expression(load_expr):
+    """ CompiledExpression of a load, keyed on the canonical sympy expression"""
+    expression = parse(load_expr)
+    return _compiled.get(expression, lambda: CompiledExpression(expression))
+
+
+def integrals(load_expr, start, end):
+    """ resultant and first moment of a load between start and end"""
+    expression = parse(load_expr)
+    return _integrals.get((expression, start, end), lambda: compile_expression(expression).integrals(start, end))
+
+
+def cache_info():
+    """ hit and miss statistics of the parse, compile and integral caches"""
+    return {'parsed': _parsed.info(), 'compiled': _compiled.info(), 'integrals': _integrals.info()}
+
+
+def cache_clear():
+    _parsed.clear()
+    _compiled.clear()
+    _integrals.clear()
@@ -0,0 +1,132 @@
+##Out-of-core analysis of very large meshes
+""" calculator_two for meshes that do not fit in memory. Every array that
+grows with the mesh lives in a memory mapped file in the output directory
+and is filled chunk by chunk, so only chunk_size elements are ever held as
+ordinary arrays. The solve is always float64, the diagrams can be stored
+as float32 to halve the files.
+
+    <directory>/node_coords.npy, shear_forces.npy, bending_moments.npy,
+                deflections.npy, rotations.npy
+
+the files are plain .npy, np.load(path, mmap_mode='r') opens them again.
+"""
+import os
+
+import numpy as np
+
+from . import calculator_two as calc
+from . import profiling
+
+CHUNK_SIZE = 1 << 16  # elements per chunk
+
+DIAGRAMS = ('shear_forces', 'bending_moments', 'deflections')
+OUTPUTS = DIAGRAMS + ('rotations',)
+
+
+def chunks(count, chunk_size=CHUNK_SIZE):
+    """ (start, stop) ranges covering range(count)"""
+    for start in range(0, count, chunk_size):
+        yield start, min(start + chunk_size, count)
+
+
+def chunked_extrema(array, chunk_size=CHUNK_SIZE):
+    """ min and max of a (memory mapped) array and where they are, reading
+    one chunk at a time
+
+    Returns:
+        dict with min, max, argmin and argmax
+    """
+    extrema = {'min': np.inf, 'max': -np.inf, 'argmin': -1, 'argmax': -1}
+    for start, stop in chunks(len(array), chunk_size):
+        values = np.asarray(array[start:stop], dtype=float)
+        low, high = values.argmin(), values.argmax()
+        if values[low] < extrema['min']:
+            extrema['min'], extrema['argmin'] = float(values[low]), start + int(low)
+        if values[high] > extrema['max']:
+            extrema['max'], extrema['argmax'] = float(values[high]), start + int(high)
+    return extrema
+
+
+def write_mesh(path, length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments, chunk_size=CHUNK_SIZE):
+    """ the mesh of calculator_two.build_mesh written chunk by chunk into a .npy file"""
+    keys, counts = calc.mesh_segments(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments)
+    num_nodes = int(counts.sum()) + 1
+    node_coords = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=(num_nodes,))
+    for start, stop in chunks(num_nodes, chunk_size):
+        node_coords[start:stop] = calc.segment_nodes(keys, counts, start, stop)
+    return node_coords
+
+
+def perform_analysis_out_of_core(directory, length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments, dtype=np.float32, chunk_size=CHUNK_SIZE):
+    """ calculator_two.perform_analysis_determinate with every mesh sized
+    array in memory mapped files in directory.
+    The beam is solved in memory on calculator_two.solve_mesh (with
+    max_elements=RECOVERY_ELEMENTS) and the diagrams are sampled at the nodes
+    of the requested mesh with calculator_two.nodal_diagrams, so
+    the memory does not grow with num_elements and the results do not suffer
+    from the conditioning of a huge stiffness matrix. E or I given per element
+    stay with their elements (the sections of calculator_two.assemble_system),
+    only those arrays grow with the mesh.
+    variables:  directory = output directory, created when missing
+                dtype = storage precision of the diagrams (the solve is always float64)
+                chunk_size = elements held in memory at a time
+                other variables = as in calculator_two.perform_analysis_determinate
+
+    Returns:
+        plots_data with read only memory mapped arrays (plus rotations), and
+        'extrema' with the min/max (and their node index) of every diagram
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = {name: os.path.join(directory, f'{name}.npy') for name in ('node_coords',) + OUTPUTS}
+
+    with profiling.profile('calculator_two.out_of_core') as profile:
+        with profiling.stage('meshing'):
+            node_coords = write_mesh(path['node_coords'], length, elasticity, inertia, num_elements, supports,
+                                     point_loads, distributed_loads, moments, chunk_size)
+        num_nodes = len(node_coords)
+        profiling.record('num_dofs', 2 * num_nodes)
+        outputs = {name: np.lib.format.open_memmap(path[name], mode='w+', dtype=dtype, shape=(num_nodes,)) for name in OUTPUTS}
+        reactions = sampled_analysis(node_coords, elasticity, inertia, supports, point_loads, distributed_loads, moments, outputs, chunk_size)
+        for array in outputs.values():
+            array.flush()
+        del outputs
+
+        with profiling.stage('extrema'):
+            plots_data = {name: np.load(path[name], mmap_mode='r') for name in ('node_coords',) + OUTPUTS}
+            plots_data['support_reactions'] = reactions
+            plots_data['extrema'] = {name: chunked_extrema(plots_data[name], chunk_size) for name in DIAGRAMS}
+    if profile is not None:
+        plots_data['timings'] = profile.summary()
+    return plots_data
+
+
+def sampled_analysis(node_coords, elasticity, inertia, supports, point_loads, distributed_loads, moments, outputs, chunk_size=CHUNK_SIZE):
+    """ solve on a bounded mesh and write the diagrams at every node
+
+    Returns:
+        support reactions as calculator_two.support_reactions
+    """
+    with profiling.stage('solve'):
+        # the solve mesh is bounded by RECOVERY_ELEMENTS, the nodes are sampled anyway
+        solve_coords = calc.solve_mesh(node_coords, elasticity, inertia, supports, point_loads, distributed_loads, moments,
+                                       max_elements=calc.RECOVERY_ELEMENTS)
+        system = calc.assemble_system(node_coords, elasticity, inertia, supports, solve_coords)
+        u = calc.solve_system(system, calc.system_load_vector(system, point_loads, distributed_loads, moments))
+    loads = (point_loads, distributed_loads, moments)
+
+    with profiling.stage('post-processing'):
+        for start, stop in chunks(len(node_coords), chunk_size):
+            samples = calc.nodal_diagrams(system, u, node_coords, *loads, start, stop)
+            for name in OUTPUTS:
+                outputs[name][start:stop] = samples[name]
+
+    reactions = []
+    for support_type, position in supports:
+        node_index = int(calc.nearest_nodes(node_coords, position))
+        samples = calc.nodal_diagrams(system, u, node_coords, *loads, node_index, node_index + 1)
+        reaction = {'type': support_type, 'position': position, 'force': float(samples['shear_forces'][0])}
+        if support_type == 3:
+            reaction['moment'] = float(samples['bending_moments'][0])
+        reactions.append(reaction)
+    return reactions
+
@@ -0,0 +1,62 @@
+##Vectorized sweeps over section, material and span
+import numpy as np
+
+from . import calculator_two as calc
+
+
+def sweep(elasticity, inertia, length, num_elements, supports, point_loads, distributed_loads, moments, load_scales=1.0, grid=False):
+    """ analyse the same beam layout for many values of E, I, span and load
+    scale with one factorization. Everything along the beam is given as a
+    fraction of the span, so every span shares the same mesh: the positions
+    of supports and loads and the x of the distributed load expressions
+    (q(x) is a force per metre at x * span).
+
+    A beam of span L and stiffness EI is the unit beam (span 1, EI 1) with
+    every length scaled, so its diagrams follow from the unit beam under each
+    kind of load: point loads give V, M, v = V_1, L M_1, L^3 v_1 / EI,
+    distributed loads L V_1, L^2 M_1, L^4 v_1 / EI and moments V_1 / L, M_1,
+    L^2 v_1 / EI. The unit beam is solved once with one load case per kind
+    (calculator_two.perform_analysis_load_cases, which recovers meshes finer
+    than MAX_SOLVE_ELEMENTS from its solve_mesh) and every parameter set is a
+    vectorized combination of those, times its load scale.
+    variables:  elasticity, inertia, length, load_scales = scalars or arrays broadcast
+                              together (or combined as a full grid when grid=True)
+                other variables = as in calculator_two.perform_analysis_determinate,
+                                  positions relative to the span
+
+    Returns:
+        dict with the flattened parameters, (params, nodes) arrays of node_coords,
+        shear_forces, bending_moments and deflections and their max |.| per
+        parameter set
+    """
+    if grid:
+        parameters = np.meshgrid(elasticity, inertia, length, load_scales, indexing='ij')
+    else:
+        parameters = np.broadcast_arrays(elasticity, inertia, length, load_scales)
+    elasticity, inertia, length, load_scales = (np.ravel(parameter).astype(float) for parameter in parameters)
+    flexural_rigidity = elasticity * inertia
+
+    # the unit beam under each kind of load, with the powers of the span
+    # its shear forces, bending moments and deflections scale with
+    kinds = [('point_loads', point_loads, 0), ('distributed_loads', distributed_loads, 1), ('moments', moments, -1)]
+    unit = calc.perform_analysis_load_cases(1.0, 1.0, 1.0, num_elements, supports, [{kind: loads} for kind, loads, _ in kinds])
+    node_coords = unit['node_coords']
+
+    results = {
+        'elasticity': elasticity,
+        'inertia': inertia,
+        'length': length,
+        'load_scales': load_scales,
+        'node_coords': length[:, None] * node_coords
+    }
+    span = length[:, None]
+    for key, offset in (('shear_forces', 0), ('bending_moments', 1), ('deflections', 3)):
+        values = np.zeros((len(length), len(node_coords)))
+        for case, (_, _, power) in enumerate(kinds):
+            values += span**(power + offset) * unit[key][case]
+        results[key] = load_scales[:, None] * values
+    results['deflections'] /= flexural_rigidity[:, None]
+    results['max_shear'] = np.abs(results['shear_forces']).max(axis=1)
+    results['max_moment'] = np.abs(results['bending_moments']).max(axis=1)
+    results['max_deflection'] = np.abs(results['deflections']).max(axis=1)
+    return results
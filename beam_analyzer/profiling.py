@@ -0,0 +1,154 @@
+##Stage timing and memory instrumentation
+""" opt-in profiling of the analysis stages. Set BEAM_PROFILE=1 (or call
+enable()) and every instrumented analysis returns a 'timings' entry:
+
+    {'name': ..., 'total': s, 'stages': {'assembly': s, 'assembly.factorization': s, ...},
+     'peak_memory_mib': ..., 'num_dofs': ..., 'events': [(stage, start, duration), ...]}
+
+nested stages are named parent.child. write_trace() saves the recent
+profiles as a Chrome trace (chrome://tracing, Perfetto, speedscope).
+When profiling is off a stage is a shared no-op context manager.
+"""
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+ENABLED = os.environ.get('BEAM_PROFILE', '') not in ('', '0')
+TRACE_FILE = os.environ.get('BEAM_PROFILE_TRACE') or None
+
+# finished profiles kept for write_trace
+recent = collections.deque(maxlen=256)
+
+_state = threading.local()
+_NO_STAGE = contextlib.nullcontext()
+
+
+def enable(flag=True, trace_file=None):
+    global ENABLED, TRACE_FILE
+    ENABLED = flag
+    if trace_file is not None:
+        TRACE_FILE = trace_file
+
+
+class Profile:
+    """ timings of one analysis, built by profile() and stage()"""
+
+    def __init__(self, name):
+        self.name = name
+        self.events = []   # (stage path, start, duration) in seconds
+        self.values = {}
+        self.path = []
+        self.start = time.perf_counter()
+        self.total = None
+        self.peak_memory = None
+
+    def summary(self):
+        stages = {}
+        for name, _, duration in self.events:
+            stages[name] = stages.get(name, 0.0) + duration
+        timings = {'name': self.name, 'total': self.total, 'stages': stages, 'events': list(self.events)}
+        if self.peak_memory is not None:
+            timings['peak_memory_mib'] = self.peak_memory / 2**20
+        timings.update(self.values)
+        return timings
+
+
+def current():
+    """ the profile of the analysis running on this thread, None when off"""
+    return getattr(_state, 'profile', None)
+
+
+@contextlib.contextmanager
+def _profile(name):
+    profile = _state.profile = Profile(name)
+    # tracemalloc is only started here, it slows allocation down while on
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        yield profile
+    finally:
+        profile.total = time.perf_counter() - profile.start
+        profile.peak_memory = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+        _state.profile = None
+        recent.append(profile.summary())
+
+
+def profile(name):
+    """ context manager around a whole analysis, yields the Profile or None
+    when profiling is off. Inside another profile it is just a stage."""
+    if not ENABLED:
+        return contextlib.nullcontext()
+    if current() is not None:
+        return _stage(current(), name, None)
+    return _profile(name)
+
+
+@contextlib.contextmanager
+def _stage(profile, name, result=None):
+    profile.path.append(name)
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        profile.events.append(('.'.join(profile.path), start - profile.start, time.perf_counter() - start))
+        profile.path.pop()
+
+
+def stage(name):
+    """ time the block as a named stage of the current profile"""
+    profile = getattr(_state, 'profile', None)
+    if profile is None:
+        return _NO_STAGE
+    return _stage(profile, name)
+
+
+def record(key, value):
+    """ store a value (DOF count, ...) in the current profile"""
+    profile = getattr(_state, 'profile', None)
+    if profile is not None:
+        profile.values[key] = value
+
+
+def format_summary(timings):
+    """ one line status text of a timings dict, top level stages only"""
+    stages = ', '.join(f'{name} {duration * 1e3:.1f}' for name, duration in timings['stages'].items() if '.' not in name)
+    text = f"{timings['name']}: {timings['total'] * 1e3:.1f} ms ({stages})"
+    if 'num_dofs' in timings:
+        text += f", {timings['num_dofs']} DOFs"
+    if 'peak_memory_mib' in timings:
+        text += f", peak {timings['peak_memory_mib']:.1f} MiB"
+    return text
+
+
+def trace_events(timings, pid=0, tid=0, offset=0.0):
+    """ Chrome trace 'complete' events of a timings dict, times in us"""
+    events = [{'name': timings['name'], 'cat': 'analysis', 'ph': 'X', 'pid': pid, 'tid': tid,
+               'ts': offset * 1e6, 'dur': timings['total'] * 1e6,
+               'args': {key: value for key, value in timings.items() if key not in ('name', 'total', 'stages', 'events')}}]
+    for name, start, duration in timings['events']:
+        events.append({'name': name.rsplit('.', 1)[-1], 'cat': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                       'ts': (offset + start) * 1e6, 'dur': duration * 1e6})
+    return events
+
+
+def write_trace(path, profiles=None):
+    """ write timings dicts (the recent profiles by default) as a JSON trace,
+    the analyses are laid out one after the other"""
+    if profiles is None:
+        profiles = list(recent)
+    events = []
+    offset = 0.0
+    for timings in profiles:
+        events += trace_events(timings, offset=offset)
+        offset += timings['total']
+    with open(path, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+    return path
@@ -0,0 +1,200 @@
+##Persistent cache of analysis results
+""" plots_data of calculator_two stored on disk under the sha256 of the
+canonical inputs. Every entry is a directory with one .npy file per array
+and a meta.json, hits open the arrays memory mapped (read only), so a large
+result is not read until it is used.
+
+    <directory>/entries/<key>/node_coords.npy, ..., meta.json
+    <directory>/tmp/       entries being written or deleted
+    <directory>/lock       serialises eviction between processes
+
+entries are written in tmp/ and renamed into entries/ in one step, so other
+processes only ever see complete entries. The least recently used entries
+(by directory mtime, touched on every hit) are deleted when the cache grows
+over max_bytes. Bump SOLVER_VERSION when the solver results change, the old
+entries are then never hit and age out.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from . import calculator_two as calc
+from . import profiling
+
+try:
+    import fcntl
+except ImportError:
+    # no inter-process lock on Windows, eviction is still safe for readers
+    fcntl = None
+
+SOLVER_VERSION = 'calculator_two/2'
+DEFAULT_DIRECTORY = os.environ.get('BEAM_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'beam_analyzer')
+DEFAULT_MAX_BYTES = 1 << 30
+
+ARRAYS = ('node_coords', 'shear_forces', 'bending_moments', 'deflections')
+
+
+def canonical(value):
+    """ JSON-able form of the inputs, numbers become floats so 10 and 10.0
+    give the same key"""
+    if isinstance(value, dict):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [canonical(item) for item in value]
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return str(value)
+
+
+def cache_key(**inputs):
+    """ sha256 of the solver version and the canonical inputs"""
+    text = json.dumps({'solver': SOLVER_VERSION, 'inputs': canonical(inputs)}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    """ on-disk LRU cache of plots_data, safe to share between processes
+    variables:  directory = cache root, created when missing
+                max_bytes = size the cache is trimmed to after every store"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.max_bytes = max_bytes
+        self.entries = os.path.join(self.directory, 'entries')
+        self.tmp = os.path.join(self.directory, 'tmp')
+        os.makedirs(self.entries, exist_ok=True)
+        os.makedirs(self.tmp, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """ the cached plots_data with memory mapped arrays, or None"""
+        path = os.path.join(self.entries, key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as file:
+                data = json.load(file)
+            for name in ARRAYS:
+                data[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            # the mtime orders the entries for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            # missing, or evicted by another process while reading
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, plots_data):
+        """ store the arrays and support reactions of plots_data"""
+        path = os.path.join(self.entries, key)
+        if os.path.isdir(path):
+            return
+        staging = tempfile.mkdtemp(dir=self.tmp)
+        try:
+            for name in ARRAYS:
+                np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(plots_data[name]))
+            reactions = [{name: int(value) if name == 'type' else float(value) for name, value in reaction.items()}
+                         for reaction in plots_data['support_reactions']]
+            with open(os.path.join(staging, 'meta.json'), 'w') as file:
+                json.dump({'support_reactions': reactions}, file)
+            os.rename(staging, path)
+        except OSError:
+            # another process stored the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self, max_bytes=None):
+        """ delete the least recently used entries until the cache fits"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock():
+            entries = []
+            for entry in os.scandir(self.entries):
+                try:
+                    size = sum(item.stat().st_size for item in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                except OSError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def clear(self):
+        self.evict(0)
+
+    def info(self):
+        entries = os.listdir(self.entries)
+        size = sum(os.path.getsize(os.path.join(self.entries, entry, name))
+                   for entry in entries for name in os.listdir(os.path.join(self.entries, entry)))
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(entries), 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def _remove(self, path):
+        # renamed away first, readers see the entry complete or not at all
+        trash = tempfile.mkdtemp(dir=self.tmp)
+        try:
+            os.rename(path, os.path.join(trash, 'entry'))
+        except OSError:
+            pass
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def _lock(self):
+        return _FileLock(os.path.join(self.directory, 'lock'))
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def analysis_key(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments, node_coords=None, tolerance=None):
+    """ cache_key of the arguments of perform_analysis_determinate"""
+    return cache_key(length=length, elasticity=elasticity, inertia=inertia, num_elements=num_elements,
+                     supports=supports, point_loads=point_loads, distributed_loads=distributed_loads,
+                     moments=moments, node_coords=node_coords, tolerance=tolerance)
+
+
+def cached_analysis(cache, length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments, node_coords=None, tolerance=None, progress=None):
+    """ calculator_two.perform_analysis_determinate through a ResultCache,
+    with cache=None it just runs the analysis
+
+    Returns:
+        plots_data, memory mapped when it came from the cache
+    """
+    with profiling.profile('cached analysis') as profile:
+        data = None
+        if cache is not None:
+            calc.report_progress(progress, 'cache lookup')
+            with profiling.stage('cache lookup'):
+                key = analysis_key(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads,
+                                   moments, node_coords, tolerance)
+                data = cache.get(key)
+        if data is None:
+            data = calc.perform_analysis_determinate(length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads,
+                                                     moments, node_coords=node_coords, tolerance=tolerance, progress=progress)
+            if cache is not None:
+                with profiling.stage('cache store'):
+                    cache.put(key, data)
+    if profile is not None:
+        data['timings'] = profile.summary()
+    return data
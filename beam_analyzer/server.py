@@ -0,0 +1,429 @@
+##Local analysis server with warm worker processes
+""" a long running localhost HTTP service, scripts and the GUI send it beams
+instead of importing and warming up the calculators themselves
+
+    python -m beam_analyzer.server --address 127.0.0.1:8765 --workers 4 --cache-dir cache
+
+    POST /analyze   beam definition as JSON (the fields of batch.py, Content-Type
+                    application/json), answers an .npz with node_coords,
+                    shear_forces, bending_moments, deflections and
+                    support_reactions (type, position, force, moment rows,
+                    NaN moment for other than fixed supports)
+    GET  /metrics   request counts, latency percentiles, throughput and batch sizes
+    GET  /health    ok
+
+The requests are not authenticated, so only loopback addresses are served
+unless --allow-remote is given. Distributed load expressions are checked
+against calculator_two.check_load_expression before they are evaluated.
+
+The worker processes import calculator_two and solve a small beam before the
+first request. Requests arriving within batch_window of each other that share
+the geometry (span, E, I, num_elements, supports) and the positions of their
+loads, so they have the same mesh on their own, are solved together by
+calculator_two.perform_analysis_load_cases, one factorization and a multi
+right-hand side solve. Every request goes through the result cache when the
+server has one.
+AnalysisClient is the Python side, BEAM_SERVER=host:port makes the GUI use it.
+"""
+import argparse
+import collections
+import http.client
+import io
+import ipaddress
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+ARRAYS = ('node_coords', 'shear_forces', 'bending_moments', 'deflections')
+LOAD_FIELDS = ('point_loads', 'distributed_loads', 'moments')
+
+
+def parse_address(address):
+    """ (host, port) of a 'host:port' string"""
+    host, _, port = (address or DEFAULT_ADDRESS).rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def is_loopback(host):
+    """ True when every address the host name resolves to is a loopback one"""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(address.split('%')[0]).is_loopback for address in addresses)
+
+
+def beam_arguments(beam):
+    """ positional arguments of perform_analysis_determinate of a beam definition"""
+    return (float(beam['length']), beam['elasticity'], beam['inertia'], int(beam.get('num_elements', 100)),
+            [tuple(support) for support in beam.get('supports', [])],
+            [tuple(load) for load in beam.get('point_loads', [])],
+            [tuple(load) for load in beam.get('distributed_loads', [])],
+            [tuple(moment) for moment in beam.get('moments', [])])
+
+
+def geometry_key(beam):
+    """ what the factored stiffness and the mesh depend on, the key positions
+    included so a beam solved in a group gets the mesh it gets alone. None
+    for beams that need their own mesh (adaptive refinement or a given mesh)"""
+    if beam.get('tolerance') is not None or beam.get('node_coords') is not None:
+        return None
+    from . import calculator_two as calc
+    length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments = beam_arguments(beam)
+    keys = calc.key_positions(length, supports, point_loads, distributed_loads, moments)
+    return json.dumps([length, np.asarray(elasticity).tolist(), np.asarray(inertia).tolist(), num_elements, supports, keys.tolist()])
+
+
+def encode_result(plots_data):
+    """ plots_data as the bytes of an uncompressed .npz"""
+    reactions = np.array([[reaction['type'], reaction['position'], reaction['force'], reaction.get('moment', np.nan)]
+                          for reaction in plots_data['support_reactions']], dtype=float).reshape(-1, 4)
+    buffer = io.BytesIO()
+    np.savez(buffer, support_reactions=reactions, **{name: np.asarray(plots_data[name], dtype=float) for name in ARRAYS})
+    return buffer.getvalue()
+
+
+def decode_result(data):
+    """ plots_data of encode_result bytes"""
+    with np.load(io.BytesIO(data)) as arrays:
+        plots_data = {name: arrays[name] for name in ARRAYS}
+        reactions = arrays['support_reactions']
+    plots_data['support_reactions'] = []
+    for support_type, position, force, moment in reactions:
+        reaction = {'type': int(support_type), 'position': float(position), 'force': float(force)}
+        if not np.isnan(moment):
+            reaction['moment'] = float(moment)
+        plots_data['support_reactions'].append(reaction)
+    return plots_data
+
+
+#===================== worker processes =====================#
+
+def warm_up():
+    """ pool initializer, imports the solver (scipy included) and fills the
+    load expression cache before the first request"""
+    from . import calculator_two as calc
+    calc.perform_analysis_determinate(10, 2e8, 1e-4, 10, [(2, 0), (1, 10)], [(10, 5)], [('1', 0, 10)], [(1, 5)])
+
+
+def analyze_request(beam, cache_dir=None):
+    """ one beam on its own mesh, through the result cache when there is one"""
+    from . import result_cache
+    cache = result_cache.ResultCache(cache_dir) if cache_dir is not None else None
+    node_coords = beam.get('node_coords')
+    data = result_cache.cached_analysis(cache, *beam_arguments(beam), tolerance=beam.get('tolerance'),
+                                        node_coords=None if node_coords is None else np.asarray(node_coords, dtype=float))
+    return encode_result(data)
+
+
+def analyze_group(beams, cache_dir=None):
+    """ beams of the same geometry_key as load cases of one system, the
+    cached ones are read from the result cache when there is one
+
+    Returns:
+        encoded result of every beam
+    """
+    from . import calculator_two as calc
+    from . import result_cache
+    cache = result_cache.ResultCache(cache_dir) if cache_dir is not None else None
+    keys = [result_cache.analysis_key(*beam_arguments(beam)) for beam in beams]
+    data = [cache.get(key) if cache is not None else None for key in keys]
+    missing = [j for j in range(len(beams)) if data[j] is None]
+    if missing:
+        length, elasticity, inertia, num_elements, supports = beam_arguments(beams[0])[:5]
+        load_cases = [dict(zip(LOAD_FIELDS, beam_arguments(beams[j])[5:])) for j in missing]
+        results = calc.perform_analysis_load_cases(length, elasticity, inertia, num_elements, supports, load_cases)
+        for case, j in enumerate(missing):
+            data[j] = {'node_coords': results['node_coords'],
+                       'shear_forces': results['shear_forces'][case],
+                       'bending_moments': results['bending_moments'][case],
+                       'deflections': results['deflections'][case],
+                       'support_reactions': results['support_reactions'][case]}
+            if cache is not None:
+                cache.put(keys[j], data[j])
+    return [encode_result(plots_data) for plots_data in data]
+
+
+#===================== server =====================#
+
+class Metrics:
+    """ thread safe request counters and the latency of the last requests"""
+
+    def __init__(self, window=1024):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.latencies = collections.deque(maxlen=window)  # (finished at, seconds)
+        self.batches = collections.Counter()                # batch size -> count
+
+    def request_done(self, latency, failed=False):
+        with self.lock:
+            self.requests += 1
+            self.errors += failed
+            self.latencies.append((time.time(), latency))
+
+    def batch_done(self, size):
+        with self.lock:
+            self.batches[size] += 1
+
+    def summary(self):
+        with self.lock:
+            now = time.time()
+            latencies = np.array([latency for _, latency in self.latencies])
+            recent = sum(finished > now - 60 for finished, _ in self.latencies)
+            summary = {
+                'uptime_s': now - self.started,
+                'requests': self.requests,
+                'errors': self.errors,
+                'throughput_per_s': self.requests / max(now - self.started, 1e-9),
+                'recent_throughput_per_s': recent / min(60.0, max(now - self.started, 1e-9)),
+                'batch_sizes': {str(size): count for size, count in sorted(self.batches.items())},
+            }
+        if len(latencies):
+            summary['latency_ms'] = {name: float(value) * 1e3 for name, value in
+                                     zip(('p50', 'p95', 'p99'), np.percentile(latencies, [50, 95, 99]))}
+            summary['latency_ms']['max'] = float(latencies.max()) * 1e3
+        return summary
+
+
+class Batcher:
+    """ collects the requests of batch_window seconds (at most max_batch) and
+    sends every group of equal geometry to the pool as one job"""
+
+    def __init__(self, executor, metrics, cache_dir=None, batch_window=0.002, max_batch=64):
+        self.executor = executor
+        self.metrics = metrics
+        self.cache_dir = cache_dir
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name='batcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, beam):
+        """ Future of the encoded result of a beam"""
+        future = Future()
+        self.queue.put((beam, future))
+        return future
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+            self.dispatch(batch)
+
+    def dispatch(self, batch):
+        groups = collections.defaultdict(list)
+        for beam, future in batch:
+            try:
+                key = geometry_key(beam)
+            except (KeyError, TypeError, ValueError) as error:
+                future.set_exception(error)
+                continue
+            groups[key if key is not None else id(future)].append((beam, future))
+        for group in groups.values():
+            self.metrics.batch_done(len(group))
+            if len(group) == 1:
+                (beam, future), = group
+                self.executor.submit(analyze_request, beam, self.cache_dir).add_done_callback(
+                    lambda job, future=future: self.resolve(job, [future]))
+            else:
+                self.executor.submit(analyze_group, [beam for beam, _ in group], self.cache_dir).add_done_callback(
+                    lambda job, group=group: self.resolve(job, [future for _, future in group], group))
+
+    def resolve(self, job, futures, group=None):
+        error = job.exception()
+        if error is None:
+            results = job.result()
+            for future, result in zip(futures, results if group is not None else [results]):
+                future.set_result(result)
+        elif group is not None:
+            # one bad load must not fail the others, solve them one by one
+            for beam, future in group:
+                self.executor.submit(analyze_request, beam, self.cache_dir).add_done_callback(
+                    lambda job, future=future: self.resolve(job, [future]))
+        else:
+            futures[0].set_exception(error)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self.reply(200, json.dumps(self.server.metrics.summary()).encode(), 'application/json')
+        elif self.path == '/health':
+            self.reply(200, b'ok', 'text/plain')
+        else:
+            self.reply(404, b'not found', 'text/plain')
+
+    def do_POST(self):
+        if self.path != '/analyze':
+            self.reply(404, b'not found', 'text/plain')
+            return
+        if self.headers.get_content_type() != 'application/json':
+            # the body is not read, the connection can't carry another request
+            self.close_connection = True
+            self.reply(415, json.dumps({'error': 'The beam must be sent as application/json'}).encode(), 'application/json')
+            return
+        started = time.perf_counter()
+        try:
+            beam = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            result = self.server.batcher.submit(beam).result(self.server.timeout_s)
+        except Exception as error:
+            self.server.metrics.request_done(time.perf_counter() - started, failed=True)
+            self.reply(400, json.dumps({'error': f'{type(error).__name__}: {error}'}).encode(), 'application/json')
+            return
+        self.server.metrics.request_done(time.perf_counter() - started)
+        self.reply(200, result, 'application/octet-stream')
+
+    def reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    """ the HTTP server with its worker pool and batcher
+    variables:  address = 'host:port' to listen on
+                workers = worker processes (default: all cores)
+                cache_dir = optional result cache of the requests
+                batch_window = seconds a request waits for others of its geometry
+                max_batch = most requests solved together
+                timeout_s = longest a request may take
+                allow_remote = listen on other than loopback addresses (ValueError otherwise)"""
+
+    daemon_threads = True
+    # many scripts connect at once, the default backlog of 5 resets them
+    request_queue_size = 128
+
+    def __init__(self, address=DEFAULT_ADDRESS, workers=None, cache_dir=None, batch_window=0.002, max_batch=64, timeout_s=300, verbose=False,
+                 allow_remote=False):
+        host, port = parse_address(address)
+        if not allow_remote and not is_loopback(host):
+            raise ValueError(f"{host} is not a loopback address, the server has no authentication (allow_remote=True to serve it anyway)")
+        super().__init__((host, port), RequestHandler)
+        self.metrics = Metrics()
+        workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+        # the pool starts its processes on demand, start (and warm up) all of them now
+        for _ in range(workers):
+            self.executor.submit(int)
+        self.batcher = Batcher(self.executor, self.metrics, cache_dir, batch_window, max_batch)
+        self.timeout_s = timeout_s
+        self.verbose = verbose
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+        self.executor.shutdown(cancel_futures=True)
+
+
+#===================== client =====================#
+
+class AnalysisClient:
+    """ runs analyses on an AnalysisServer, analyze() takes the arguments of
+    result_cache.cached_analysis without the cache
+    variables:  address = 'host:port' of the server, BEAM_SERVER or the default
+                timeout_s = socket timeout"""
+
+    def __init__(self, address=None, timeout_s=300):
+        self.host, self.port = parse_address(address or os.environ.get('BEAM_SERVER'))
+        self.timeout_s = timeout_s
+
+    def request(self, method, path, body=None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout_s)
+        try:
+            connection.request(method, path, body, {'Content-Type': 'application/json'} if body else {})
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        if response.status != 200:
+            try:
+                message = json.loads(data)['error']
+            except (ValueError, KeyError):
+                message = data.decode(errors='replace')
+            raise ValueError(message)
+        return data
+
+    def analyze(self, length, elasticity, inertia, num_elements, supports, point_loads, distributed_loads, moments, node_coords=None, tolerance=None, progress=None):
+        """ plots_data of the beam as calculator_two.perform_analysis_determinate"""
+        if progress is not None:
+            progress('server')
+        beam = {'length': length, 'elasticity': np.asarray(elasticity).tolist(), 'inertia': np.asarray(inertia).tolist(),
+                'num_elements': num_elements, 'supports': supports, 'point_loads': point_loads,
+                'distributed_loads': distributed_loads, 'moments': moments, 'tolerance': tolerance,
+                'node_coords': None if node_coords is None else np.asarray(node_coords).tolist()}
+        return decode_result(self.request('POST', '/analyze', json.dumps(beam).encode()))
+
+    def metrics(self):
+        return json.loads(self.request('GET', '/metrics'))
+
+    def health(self):
+        """ True when the server answers"""
+        try:
+            return self.request('GET', '/health') == b'ok'
+        except OSError:
+            return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve beam analyses to local scripts and the GUI")
+    parser.add_argument('--address', default=os.environ.get('BEAM_SERVER') or DEFAULT_ADDRESS, help="host:port to listen on")
+    parser.add_argument('--workers', '-j', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--cache-dir', help="result cache of the requests")
+    parser.add_argument('--batch-window', type=float, default=2.0, help="ms a request waits for others of its geometry")
+    parser.add_argument('--max-batch', type=int, default=64, help="most requests solved together")
+    parser.add_argument('--allow-remote', action='store_true', help="listen on other than loopback addresses, anyone reaching them can run analyses")
+    parser.add_argument('--verbose', '-v', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    if not args.allow_remote and not is_loopback(parse_address(args.address)[0]):
+        parser.error(f"{args.address} is not a loopback address, give --allow-remote to serve it")
+    server = AnalysisServer(args.address, args.workers, args.cache_dir, args.batch_window / 1e3, args.max_batch, verbose=args.verbose,
+                            allow_remote=args.allow_remote)
+    print(f"serving on {args.address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+##Exact diagrams of determinate beams with singularity (Macaulay) functions
+""" Once the reactions of a determinate beam are known every load, reaction
+included, is a term of the load function p(x) (down positive, moments
+clockwise positive as in calculator_one):
+
+    point force F at a       F <x - a>^0
+    moment C at c            C <x - c>^-1
+    distributed load q on [s, e]   q(x) between s and e
+
+and the diagrams are its repeated integrals from the free left end,
+
+    V = -P_1(x)    M = P_2(x) - sum C <x - c>^0
+    EI theta = -P_3(x) + sum C <x - c>^1 + EI c_1
+    EI v = -P_4(x) + sum C <x - c>^2 / 2 + EI (c_1 x + c_2)
+
+with c_1, c_2 from the zero deflection (and slope) at the supports. The
+signs are those of calculator_two's plots_data inside the beam. At x = L
+the diagrams are the limit from the left, while the last node of
+plots_data holds the end forces of the last element, so its shear force
+and bending moment are those of x = L with the opposite sign.
+diagram_coefficients does the symbolic work once, evaluate_diagrams is then
+pure NumPy for any number of positions.
+"""
+import math
+
+import numpy as np
+
+from . import profiling
+from .beam_model import BeamModel, POINT_LOAD, MOMENT, DISTRIBUTED_LOAD, ROLLER, FIXED
+
+CHUNK_SIZE = 1 << 16  # positions evaluated at a time
+
+FACTORIALS = np.array([math.factorial(k) for k in range(5)], dtype=float)
+
+
+def diagram_coefficients(model, elasticity, inertia):
+    """ singularity function terms of a BeamModel whose reactions are solved
+    (calculator_one.analyze_model), with the integration constants
+    variables:  model = resolved BeamModel
+                elasticity, inertia = E (Pa) and I (m^4), one value for the whole beam
+
+    Returns:
+        dict with the point forces and moments (positions, values), the distributed
+        loads (start, end, [q, Q_1 .. Q_4]), E*I and the constants c_1, c_2
+    """
+    if np.ndim(np.multiply(elasticity, inertia)) > 0:
+        raise ValueError("Singularity functions need the same E and I for the whole beam")
+    if np.isnan(model.force[model.kind != DISTRIBUTED_LOAD]).any() or np.isnan(model.moment).any():
+        raise ValueError("The support reactions of the model are not solved")
+
+    # reactions are point forces and moments like the loads, the ones on the
+    # right end never act inside the beam (the end shows the left limit)
+    inside = model.start < model.length
+    forces = ((model.kind == POINT_LOAD) | (model.kind >= ROLLER)) & inside
+    couples = ((model.kind == MOMENT) | (model.kind == FIXED)) & inside
+    distributed = []
+    if model.expressions:
+        from . import expression_cache
+    for row, load_expr in model.expressions.items():
+        functions = expression_cache.compile_expression(load_expr).nested_antiderivatives(4)
+        if functions is None:
+            raise ValueError(f"The distributed load {load_expr} has no closed form antiderivative")
+        start, end = sorted((model.start[row], model.end[row]))
+        distributed.append((start, end, functions))
+
+    coefficients = {
+        'length': model.length,
+        'flexural_rigidity': float(np.multiply(elasticity, inertia)),
+        'forces': (model.start[forces], model.force[forces]),
+        'couples': (model.start[couples], model.moment[couples]),
+        'distributed': distributed,
+        'constants': (0.0, 0.0)
+    }
+
+    # zero deflection at every support and zero slope at the fixed ones
+    rows = model.support_rows
+    fixed = rows[model.kind[rows] == FIXED]
+    if len(rows) + len(fixed) != 2:
+        # two constants, more conditions belong to an indeterminate beam
+        raise ValueError("Singularity functions need a determinate beam (two support conditions), "
+                         f"this one has {len(rows) + len(fixed)}")
+    positions = np.concatenate([model.start[rows], model.start[fixed]])
+    values = evaluate_diagrams(coefficients, positions)
+    A = np.concatenate([np.column_stack([model.start[rows], np.ones(len(rows))]),
+                        np.column_stack([np.ones(len(fixed)), np.zeros(len(fixed))])])
+    b = -np.concatenate([values['deflections'][:len(rows)], values['rotations'][len(rows):]])
+    if abs(np.linalg.det(A)) < 1e-12 * max(1.0, model.length):
+        raise ValueError("The supports do not fix the deflection, the beam is unstable")
+    constants = np.linalg.solve(A, b)
+    coefficients['constants'] = tuple(constants.tolist())
+    return coefficients
+
+
+def load_integrals(coefficients, x):
+    """ P_1 .. P_4 of the point forces and distributed loads at x, shape (4, m)"""
+    integrals = np.zeros((4, len(x)))
+    positions, values = coefficients['forces']
+    if len(positions):
+        distance = x[:, None] - positions
+        reached = distance >= 0
+        for k in range(1, 5):
+            integrals[k - 1] = (np.where(reached, distance, 0) ** (k - 1) * reached) @ values / FACTORIALS[k - 1]
+
+    for start, end, functions in coefficients['distributed']:
+        inside = np.clip(x, start, end)
+        reached = x >= start
+        # k-fold integral from start: Q_k(x) minus its Taylor polynomial at start
+        Q = [np.broadcast_to(function(inside), inside.shape) for function in functions]
+        Q_start = [float(function(start)) for function in functions]
+        I = [np.zeros_like(x)]
+        for k in range(1, 5):
+            I.append(Q[k] - sum(Q_start[k - j] * (inside - start) ** j / FACTORIALS[j] for j in range(k)))
+        # past the end the integrals continue as polynomials
+        beyond = x - inside
+        for k in range(1, 5):
+            integrals[k - 1] += reached * sum(I[k - j] * beyond ** j / FACTORIALS[j] for j in range(k))
+    return integrals
+
+
+def evaluate_diagrams(coefficients, positions, chunk_size=CHUNK_SIZE):
+    """ shear force, bending moment, rotation and deflection at any positions
+    variables:  coefficients = diagram_coefficients of the beam
+                positions = positions along the beam (m), any number
+                chunk_size = positions evaluated at a time, bounds the memory
+
+    Returns:
+        dict with the positions and the deflections, rotations, bending_moments
+        and shear_forces there, in the sign convention of plots_data (but see
+        the module docstring for x = L)
+    """
+    positions = np.asarray(positions, dtype=float)
+    flexural_rigidity = coefficients['flexural_rigidity']
+    c_1, c_2 = coefficients['constants']
+    couple_positions, couple_values = coefficients['couples']
+    results = {name: np.empty(len(positions)) for name in ('deflections', 'rotations', 'bending_moments', 'shear_forces')}
+    for start in range(0, len(positions), chunk_size):
+        x = positions[start:start + chunk_size]
+        chunk = slice(start, start + len(x))
+        P = load_integrals(coefficients, x)
+        # moments only enter from M on, <x - c>^k / k! for k = 0..2
+        distance = x[:, None] - couple_positions
+        reached = distance >= 0
+        C = [(np.where(reached, distance, 0) ** k * reached) @ couple_values / FACTORIALS[k] for k in range(3)]
+        results['shear_forces'][chunk] = -P[0]
+        results['bending_moments'][chunk] = P[1] - C[0]
+        results['rotations'][chunk] = (-P[2] + C[1]) / flexural_rigidity + c_1
+        results['deflections'][chunk] = (-P[3] + C[2]) / flexural_rigidity + c_1 * x + c_2
+    results['positions'] = positions
+    return results
+
+
+def determinate_diagrams(length, elasticity, inertia, supports, point_loads, distributed_loads, moments, positions):
+    """ exact diagrams of a determinate beam without a mesh: the reactions of
+    calculator_one and the singularity functions evaluated at the positions
+    variables:  length, elasticity, inertia, supports, point_loads, distributed_loads,
+                moments = as in calculator_one.perform_analysis_determinate
+                positions = positions along the beam (m), or a number of evenly spaced ones
+
+    Returns:
+        dict as evaluate_diagrams, plus the support_reactions of the model
+    """
+    from . import calculator_one
+
+    with profiling.profile('singularity') as profile:
+        with profiling.stage('model'):
+            model = BeamModel.from_inputs(length, supports, point_loads, distributed_loads, moments)
+        with profiling.stage('reactions'):
+            calculator_one.analyze_model(model)
+        with profiling.stage('coefficients'):
+            coefficients = diagram_coefficients(model, elasticity, inertia)
+        with profiling.stage('evaluation'):
+            if np.ndim(positions) == 0:
+                positions = np.linspace(0, length, int(positions))
+            results = evaluate_diagrams(coefficients, positions)
+        # reactions in the calculator_one sign convention (same axis as the loads)
+        results['support_reactions'] = []
+        for (support_type, position), row in zip(model.supports, model.support_rows):
+            reaction = {'type': support_type, 'position': position, 'force': float(model.force[row])}
+            if support_type == 3:
+                reaction['moment'] = float(model.moment[row])
+            results['support_reactions'].append(reaction)
+    if profile is not None:
+        results['timings'] = profile.summary()
+    return results
@@ -0,0 +1,268 @@
+##Benchmark and accuracy regression suite for both calculators
+""" times both calculators on growing meshes, many loads, many load cases
+and symbolic vs numeric distributed loads, checks them against textbook
+closed form solutions (ERROR_BOUNDS) and compares every case with the
+previous run
+
+    python benchmarks/bench_calculators.py                   # up to 10^5 elements
+    python benchmarks/bench_calculators.py --max-elements 1000000
+    python benchmarks/bench_calculators.py --fail-on-regression
+
+every run is appended as one JSON line to benchmarks/results.jsonl
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from beam_analyzer import calculator_one, calculator_two as calc  # noqa: E402
+
+RESULTS_FILE = os.path.join(ROOT, 'benchmarks', 'results.jsonl')
+
+# beam used by every case
+LENGTH = 10.0
+ELASTICITY = 2e8
+INERTIA = 1e-4
+EI = ELASTICITY * INERTIA
+W = 3.0   # distributed load (N/m)
+P = 10.0  # point load (N)
+
+
+#===================== closed form solutions =====================#
+# deflections are negative (downward) for downward loads, as calculator_two reports them
+def simply_supported_udl(x):
+    return {'deflections': -W * x * (LENGTH**3 - 2 * LENGTH * x**2 + x**3) / (24 * EI),
+            'max_moment': W * LENGTH**2 / 8}
+
+
+def cantilever_point_load(x):
+    return {'deflections': -P * x**2 * (3 * LENGTH - x) / (6 * EI),
+            'max_moment': P * LENGTH}
+
+
+def propped_cantilever_udl(x):
+    return {'deflections': -W * x**2 * (3 * LENGTH**2 - 5 * LENGTH * x + 2 * x**2) / (48 * EI),
+            'max_moment': W * LENGTH**2 / 8}
+
+
+# largest relative error against the closed forms, whatever the previous run
+# had (calculator_two is exact at the nodes up to the roundoff of the solve)
+ERROR_BOUNDS = {
+    'deflection_error': 1e-5,
+    'max_moment_error': 1e-5,
+    'reaction_error': 1e-12,
+}
+
+TEXTBOOK_CASES = {
+    'simply_supported_udl': ([(2, 0), (1, LENGTH)], [], [(str(W), 0, LENGTH)], simply_supported_udl),
+    'cantilever_point_load': ([(3, 0)], [(P, LENGTH)], [], cantilever_point_load),
+    'propped_cantilever_udl': ([(3, 0), (1, LENGTH)], [], [(str(W), 0, LENGTH)], propped_cantilever_udl),
+}
+
+
+#===================== measurement helpers =====================#
+def timed(function, repeats):
+    """ best wall time of the repeats and the last result"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory(function):
+    """ peak traced allocation of one call (MiB), numpy arrays included"""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def stage_breakdown(num_elements, supports, point_loads, distributed_loads, moments):
+    """ wall time of every stage of calculator_two"""
+    stages = {}
+    start = time.perf_counter()
+    node_coords = calc.build_mesh(LENGTH, ELASTICITY, INERTIA, num_elements, supports, point_loads, distributed_loads, moments)
+    solve_coords = calc.solve_mesh(node_coords, ELASTICITY, INERTIA, supports, point_loads, distributed_loads, moments)
+    stages['meshing'] = time.perf_counter() - start
+    start = time.perf_counter()
+    system = calc.assemble_system(node_coords, ELASTICITY, INERTIA, supports, solve_coords)
+    stages['assembly_and_factorization'] = time.perf_counter() - start
+    start = time.perf_counter()
+    global_f = calc.system_load_vector(system, point_loads, distributed_loads, moments)
+    stages['loads'] = time.perf_counter() - start
+    start = time.perf_counter()
+    u = calc.solve_system(system, global_f)
+    stages['solve'] = time.perf_counter() - start
+    start = time.perf_counter()
+    if solve_coords is node_coords:
+        element_loads = calc.element_load_vectors(node_coords, point_loads, distributed_loads, moments, nodal=False)
+        calc.element_end_forces(system, u, element_loads)
+    else:
+        calc.recover_nodal_values(system, u, node_coords, point_loads, distributed_loads, moments)
+    stages['post_processing'] = time.perf_counter() - start
+    return stages
+
+
+def run_case(name, function, repeats, stages=None, accuracy=None):
+    wall_time, result = timed(function, repeats)
+    case = {'name': name, 'wall_time': wall_time, 'peak_memory_mib': peak_memory(function)}
+    if stages is not None:
+        case['stages'] = stages()
+    if accuracy is not None:
+        case.update(accuracy(result))
+    print(f"{name:55s} {wall_time * 1e3:10.2f} ms {case['peak_memory_mib']:9.1f} MiB"
+          + (f"  deflection err {case['deflection_error']:.2e}" if 'deflection_error' in case else ''))
+    return case
+
+
+#===================== cases =====================#
+def mesh_cases(element_counts, repeats):
+    cases = []
+    for name, (supports, point_loads, distributed_loads, reference) in TEXTBOOK_CASES.items():
+        for num_elements in element_counts:
+            def analysis():
+                return calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, num_elements, supports, point_loads, distributed_loads, [])
+
+            def accuracy(data):
+                exact = reference(data['node_coords'])
+                scale = np.abs(exact['deflections']).max()
+                return {'num_dofs': 2 * len(data['node_coords']),
+                        'deflection_error': float(np.abs(data['deflections'] - exact['deflections']).max() / scale),
+                        'max_moment_error': float(abs(np.abs(data['bending_moments']).max() - exact['max_moment']) / exact['max_moment'])}
+
+            cases.append(run_case(f'{name}/elements={num_elements}', analysis, repeats,
+                                  lambda: stage_breakdown(num_elements, supports, point_loads, distributed_loads, []), accuracy))
+    return cases
+
+
+def load_count_cases(num_elements, load_counts, repeats):
+    cases = []
+    rng = np.random.default_rng(0)
+    for count in load_counts:
+        point_loads = [(float(force), float(position)) for force, position in zip(rng.uniform(1, 10, count), rng.uniform(0, LENGTH, count))]
+        cases.append(run_case(f'point_loads={count}/elements={num_elements}', lambda: calc.perform_analysis_determinate(
+            LENGTH, ELASTICITY, INERTIA, num_elements, [(2, 0), (1, LENGTH)], point_loads, [], []), repeats))
+    return cases
+
+
+def load_case_cases(num_elements, case_counts, repeats):
+    cases = []
+    for count in case_counts:
+        load_cases = [{'name': str(i), 'point_loads': [(P, LENGTH * (i + 1) / (count + 1))]} for i in range(count)]
+        cases.append(run_case(f'load_cases={count}/elements={num_elements}', lambda: calc.perform_analysis_load_cases(
+            LENGTH, ELASTICITY, INERTIA, num_elements, [(3, 0), (1, LENGTH)], load_cases), repeats))
+    return cases
+
+
+def distributed_load_cases(num_elements, repeats):
+    supports = [(2, 0), (1, LENGTH)]
+    cases = [
+        run_case(f'calculator_two/numeric_udl/elements={num_elements}', lambda: calc.perform_analysis_determinate(
+            LENGTH, ELASTICITY, INERTIA, num_elements, supports, [], [('3', 0, LENGTH)], []), repeats),
+        run_case(f'calculator_two/expression_load/elements={num_elements}', lambda: calc.perform_analysis_determinate(
+            LENGTH, ELASTICITY, INERTIA, num_elements, supports, [], [('3 + sin(x) * x**2 / 10', 0, LENGTH)], []), repeats),
+    ]
+    # exact reactions of the simply supported beam below: resultant and moment about x = 0
+    force = P + W * LENGTH + LENGTH**3 / 30
+    moment = P * 4 + W * LENGTH**2 / 2 + LENGTH**4 / 40
+    exact = np.array([moment / LENGTH - force, -moment / LENGTH])
+    for symbolic in (False, True):
+        def analysis():
+            return calculator_one.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, supports, [(P, 4)], [(f'{W} + x**2 / 10', 0, LENGTH)], [], symbolic=symbolic)
+
+        def accuracy(beam):
+            reactions = beam[-2:, 2].astype(float)
+            return {'reaction_error': float(np.abs(reactions - exact).max() / np.abs(exact).max())}
+        cases.append(run_case(f"calculator_one/{'symbolic' if symbolic else 'numeric'}_reactions", analysis, repeats, accuracy=accuracy))
+    return cases
+
+
+#===================== storage and comparison =====================#
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_run(path):
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                last = line
+    return json.loads(last) if last else None
+
+
+def compare(run, previous, time_tolerance, error_tolerance):
+    """ cases over their ERROR_BOUNDS, and the ones that got slower than
+    time_tolerance x or less accurate than the previous run"""
+    regressions = [f"{case['name']}: {key} {case[key]:.2e} over the bound {bound:.0e}"
+                   for case in run['cases'] for key, bound in ERROR_BOUNDS.items() if case.get(key, 0) > bound]
+    if previous is None:
+        return regressions
+    before = {case['name']: case for case in previous['cases']}
+    for case in run['cases']:
+        old = before.get(case['name'])
+        if old is None:
+            continue
+        ratio = case['wall_time'] / max(old['wall_time'], 1e-9)
+        if ratio > time_tolerance:
+            regressions.append(f"{case['name']}: {ratio:.2f}x slower ({old['wall_time'] * 1e3:.2f} -> {case['wall_time'] * 1e3:.2f} ms)")
+        for key in ('deflection_error', 'max_moment_error', 'reaction_error'):
+            if key in case and key in old and case[key] > max(old[key] * error_tolerance, 1e-12):
+                regressions.append(f"{case['name']}: {key} {old[key]:.2e} -> {case[key]:.2e}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark both beam calculators")
+    parser.add_argument('--max-elements', type=int, default=10**5, help="largest mesh, powers of 10 from 10^2")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per case, the best time is kept")
+    parser.add_argument('--results', default=RESULTS_FILE, help="JSON Lines file the runs are appended to")
+    parser.add_argument('--time-tolerance', type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument('--error-tolerance', type=float, default=1.5, help="error growth ratio reported as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    element_counts = [10**k for k in range(2, 7) if 10**k <= args.max_elements]
+    cases = mesh_cases(element_counts, args.repeats)
+    cases += load_count_cases(1000, [1, 10, 100, 1000], args.repeats)
+    cases += load_case_cases(1000, [1, 10, 100], args.repeats)
+    cases += distributed_load_cases(1000, args.repeats)
+
+    run = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cases': cases
+    }
+    regressions = compare(run, previous_run(args.results), args.time_tolerance, args.error_tolerance)
+    with open(args.results, 'a') as file:
+        file.write(json.dumps(run) + '\n')
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
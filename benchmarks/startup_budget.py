@@ -0,0 +1,85 @@
+##Startup time budget of the headless entry points
+""" runs every entry point in a fresh interpreter, keeps the best wall time
+of a few runs and fails when it is over its budget or when it imported a
+module it should not have (Qt, matplotlib, sympy before symbolic work)
+
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --scale 2    # slow machine
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUI_MODULES = ('PyQt5', 'matplotlib')
+
+POINT_LOAD_BEAM = "10, 2e8, 1e-4, 100, [(2, 0), (1, 10)], [(10, 5)], [], []"
+
+# name: (code, budget in ms above a bare interpreter, modules that must not be imported)
+CHECKS = {
+    'import beam_analyzer': (
+        "import beam_analyzer", 20, ('numpy', 'scipy', 'sympy') + GUI_MODULES),
+    'import calculator_two': (
+        "from beam_analyzer import calculator_two", 250, ('scipy', 'sympy') + GUI_MODULES),
+    'import calculator_one': (
+        "from beam_analyzer import calculator_one", 250, ('scipy', 'sympy') + GUI_MODULES),
+    'calculator_two analysis': (
+        f"import beam_analyzer; beam_analyzer.perform_analysis_determinate({POINT_LOAD_BEAM})", 600, ('sympy',) + GUI_MODULES),
+    'calculator_one point loads': (
+        "from beam_analyzer import calculator_one; "
+        "calculator_one.perform_analysis_determinate(10, 2e8, 1e-4, [(2, 0), (1, 10)], [(10, 5)], [], [])", 250, ('scipy', 'sympy') + GUI_MODULES),
+    'batch runner': (
+        "import batch", 100, ('numpy', 'sympy') + GUI_MODULES),
+}
+
+# for reference, what the GUI pays
+REFERENCE = {'import gui': "import gui"}
+
+
+def run(code, forbidden=(), repeats=5):
+    """ best wall time (s) of the code in a fresh interpreter and the
+    forbidden modules it imported"""
+    script = f"{code}\nimport sys, json\nprint(json.dumps([m for m in {list(forbidden)!r} if m in sys.modules]))"
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        best = min(best, time.perf_counter() - start)
+    return best, json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the startup time of the headless entry points")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply every budget, for slow machines")
+    parser.add_argument('--reference', action='store_true', help="also time the GUI import")
+    args = parser.parse_args(argv)
+
+    bare, _ = run("pass", repeats=args.repeats)
+    print(f"{'bare interpreter':30s} {bare * 1e3:8.1f} ms")
+    failures = []
+    for name, (code, budget, forbidden) in CHECKS.items():
+        wall_time, imported = run(code, forbidden, args.repeats)
+        cost = (wall_time - bare) * 1e3
+        limit = budget * args.scale
+        status = 'ok'
+        if cost > limit:
+            status = 'OVER BUDGET'
+            failures.append(name)
+        if imported:
+            status = f"imported {', '.join(imported)}"
+            failures.append(name)
+        print(f"{name:30s} {cost:8.1f} ms  budget {limit:6.0f} ms  {status}")
+    if args.reference:
+        for name, code in REFERENCE.items():
+            wall_time, _ = run(code, repeats=args.repeats)
+            print(f"{name:30s} {(wall_time - bare) * 1e3:8.1f} ms  (reference)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
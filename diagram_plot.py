@@ -0,0 +1,69 @@
+##One persistent diagram on a Qt canvas
+import numpy as np
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from beam_analyzer.downsampling import downsample_min_max
+
+# the axis limits are recomputed when the data leaves them or fills less than this share
+MIN_FILL = 0.5
+
+
+class DiagramPlot:
+    """ a canvas whose axes and line are created once, new results only
+    change the line data. The line is animated, so the axes, grid and labels
+    are kept as a background bitmap and a live update that fits in the
+    current limits only redraws the line (blitting).
+    variables:  title, xlabel, ylabel = axis texts"""
+
+    def __init__(self, title, xlabel, ylabel):
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.axes = self.figure.add_subplot(111)
+        self.axes.set_title(title)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        self.axes.axhline(0, color='grey', linewidth=0.5)
+        self.line, = self.axes.plot([], [], animated=True)
+        self.background = None
+        self.num_points = 0
+        # a full draw (resize, new limits) refreshes the background
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.axes.bbox)
+        self.axes.draw_artist(self.line)
+
+    def width(self):
+        """ plot width in device pixels"""
+        return max(int(self.axes.bbox.width), 1)
+
+    def update(self, x, y, blit=False):
+        """ show a new diagram, with blit=True the background is reused when
+        the data fits in the current axis limits"""
+        x, y = downsample_min_max(x, y, self.width())
+        self.line.set_data(x, y)
+        self.num_points = len(x)
+        if blit and self.background is not None and self.fits(x, y):
+            self.canvas.restore_region(self.background)
+            self.axes.draw_artist(self.line)
+            self.canvas.blit(self.axes.bbox)
+        else:
+            self.rescale(x, y)
+            self.canvas.draw()
+
+    def fits(self, x, y):
+        if len(x) == 0:
+            return True
+        (x0, x1), (y0, y1) = self.axes.get_xlim(), self.axes.get_ylim()
+        low, high = min(np.nanmin(y), 0), max(np.nanmax(y), 0)
+        return (x0 <= x[0] and x[-1] <= x1 and y0 <= low and high <= y1
+                and (high - low) >= MIN_FILL * (y1 - y0) and (x[-1] - x[0]) >= MIN_FILL * (x1 - x0))
+
+    def rescale(self, x, y):
+        if len(x) == 0:
+            return
+        low, high = min(np.nanmin(y), 0), max(np.nanmax(y), 0)
+        margin = 0.05 * (high - low) or 1.0
+        self.axes.set_xlim(x[0], x[-1] if x[-1] > x[0] else x[0] + 1)
+        self.axes.set_ylim(low - margin, high + margin)
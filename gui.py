@@ -1,13 +1,38 @@
-from PyQt5.QtWidgets import (QWidget, QLabel, QLineEdit, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QMessageBox, QDesktopWidget)
+from PyQt5.QtWidgets import (QWidget, QLabel, QLineEdit, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QMessageBox, QDesktopWidget, QCheckBox)
 from PyQt5.QtGui import QDoubleValidator
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from PyQt5.QtCore import QTimer
+import os
+from beam_analyzer import profiling, result_cache, server
+from analysis_worker import AnalysisWorker
+from diagram_plot import DiagramPlot
+
+# delay between the last edit and the live re-analysis (ms)
+LIVE_DEBOUNCE_MS = 300
 
 class BeamAnalysisApp(QWidget):
     def __init__(self):
         super().__init__()
+        self.worker = AnalysisWorker(self)
+        try:
+            # results of beams analysed before are read back from disk
+            self.result_cache = result_cache.ResultCache()
+        except OSError:
+            self.result_cache = None
+        # BEAM_SERVER=host:port sends the analyses to a running beam_analyzer.server
+        self.client = server.AnalysisClient() if os.environ.get('BEAM_SERVER') else None
+        self.worker.progress.connect(self.show_progress)
+        self.worker.finished.connect(self.show_results)
+        self.worker.failed.connect(self.show_failure)
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_DEBOUNCE_MS)
+        self.live_timer.timeout.connect(lambda: self.perform_analysis_wrapper(live=True))
         self.initUI()
 
+    def closeEvent(self, event):
+        self.worker.shutdown()
+        super().closeEvent(event)
+
     def center_top(self):
         qr = self.frameGeometry()
         cp = QDesktopWidget().availableGeometry().center()
@@ -31,6 +56,7 @@ class BeamAnalysisApp(QWidget):
             input_label = QLabel(label)
             input_entry = QLineEdit()
             input_entry.setValidator(QDoubleValidator(0.0, float('inf'),3))
+            input_entry.textChanged.connect(self.schedule_live_analysis)
             input_layout.addWidget(input_label)
             input_layout.addWidget(input_entry)
             self.entries.append(input_entry)
@@ -64,13 +90,27 @@ class BeamAnalysisApp(QWidget):
         input_layout.addWidget(self.add_moment_button)
 
         analyze_button = QPushButton("Analyze")
-        analyze_button.clicked.connect(self.perform_analysis_wrapper)
-        input_layout.addWidget(analyze_button)
+        analyze_button.clicked.connect(lambda: self.perform_analysis_wrapper())
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_analysis)
+        analyze_buttons_layout = QHBoxLayout()
+        analyze_buttons_layout.addWidget(analyze_button)
+        analyze_buttons_layout.addWidget(self.cancel_button)
+        input_layout.addLayout(analyze_buttons_layout)
+
+        self.live_checkbox = QCheckBox("Live update")
+        self.live_checkbox.toggled.connect(self.schedule_live_analysis)
+        input_layout.addWidget(self.live_checkbox)
+        self.progress_label = QLabel("")
+        input_layout.addWidget(self.progress_label)
+        # support reaction labels of the last result, replaced by the next one
+        self.reaction_labels = []
 
         # Plot placeholders
-        self.shear_force_canvas = self.create_plot_canvas("Shear Force Diagram", plot_layout)
-        self.bending_moment_canvas = self.create_plot_canvas("Bending Moment Diagram", plot_layout)
-        self.deflection_canvas = self.create_plot_canvas("Deflection Diagram", plot_layout)
+        self.shear_force_plot = self.create_plot("Shear Force Diagram", "Shear Force (N)", plot_layout)
+        self.bending_moment_plot = self.create_plot("Bending Moment Diagram", "Bending Moment (Nm)", plot_layout)
+        self.deflection_plot = self.create_plot("Deflection Diagram", "Deflection (m)", plot_layout)
 
         # Show sensitive information
         # Sensitive information labels
@@ -120,6 +160,8 @@ class BeamAnalysisApp(QWidget):
         support_input_layout.addWidget(support_position)
         support_input_layout.addWidget(delete_button)
         self.supports_layout.addLayout(support_input_layout)
+        support_type.currentIndexChanged.connect(self.schedule_live_analysis)
+        self.watch_fields(support_input_layout)
 
     def add_point_load(self):
         point_load_input_layout = QHBoxLayout()
@@ -135,6 +177,7 @@ class BeamAnalysisApp(QWidget):
         point_load_input_layout.addWidget(point_load_position)
         point_load_input_layout.addWidget(delete_button)
         self.point_loads_layout.addLayout(point_load_input_layout)
+        self.watch_fields(point_load_input_layout)
 
     def add_distributed_load(self):
         distributed_load_input_layout = QHBoxLayout()
@@ -153,6 +196,7 @@ class BeamAnalysisApp(QWidget):
         distributed_load_input_layout.addWidget(interval_end)
         distributed_load_input_layout.addWidget(delete_button)
         self.distributed_loads_layout.addLayout(distributed_load_input_layout)
+        self.watch_fields(distributed_load_input_layout)
 
     def add_moment(self):
         moment_input_layout = QHBoxLayout()
@@ -168,6 +212,14 @@ class BeamAnalysisApp(QWidget):
         moment_input_layout.addWidget(moment_position)
         moment_input_layout.addWidget(delete_button)
         self.moments_layout.addLayout(moment_input_layout)
+        self.watch_fields(moment_input_layout)
+
+    def watch_fields(self, layout):
+        # re-analyse on edits when live update is on
+        for i in range(layout.count()):
+            widget = layout.itemAt(i).widget()
+            if isinstance(widget, QLineEdit):
+                widget.textChanged.connect(self.schedule_live_analysis)
 
     def delete_widget(self, layout):
         for i in reversed(range(layout.count())):
@@ -175,14 +227,20 @@ class BeamAnalysisApp(QWidget):
             if widget is not None:
                 widget.deleteLater()
         layout.deleteLater()
+        self.schedule_live_analysis()
+
+    def schedule_live_analysis(self):
+        # restarting the timer debounces bursts of edits
+        if self.live_checkbox.isChecked():
+            self.live_timer.start()
 
-    def create_plot_canvas(self, title, layout):
+    def create_plot(self, title, ylabel, layout):
         label = QLabel(title)
         layout.addWidget(label)
-        fig = Figure()
-        canvas = FigureCanvas(fig)
-        layout.addWidget(canvas)
-        return canvas
+        # axes and line are created once, see diagram_plot.py
+        plot = DiagramPlot(title, "Position (m)", ylabel)
+        layout.addWidget(plot.canvas)
+        return plot
     
     def check_required_supports(self):
         for i in range(self.supports_layout.count()):
@@ -222,12 +280,7 @@ class BeamAnalysisApp(QWidget):
                 return False
         return True
     
-    def perform_analysis_wrapper(self):
-        # Collect inputs and call perform_analysis from calc.py
-        if not self.validate_inputs():
-            QMessageBox.warning(self, "Warning", "Please fill in all required fields and ensure correct support setup.")
-            return
-
+    def collect_inputs(self):
         length = float(self.entries[0].text())
         elasticity = float(self.entries[1].text())
         inertia = float(self.entries[2].text())
@@ -254,46 +307,72 @@ class BeamAnalysisApp(QWidget):
         moments = [(float(layout.itemAt(0).widget().text()), float(layout.itemAt(1).widget().text()))
                   for layout in (self.moments_layout.itemAt(i).layout() for i in range(self.moments_layout.count()))]
         
-        import calculator_two as calc
+        return length, elasticity, inertia, supports, point_loads, distributed_loads, moments
+
+    def perform_analysis_wrapper(self, live=False):
+        # Collect inputs and run perform_analysis from calc.py on the worker thread
+        try:
+            if not self.validate_inputs():
+                raise ValueError
+            inputs = self.collect_inputs()
+        except ValueError:
+            # half typed fields are expected while editing live
+            if not live:
+                QMessageBox.warning(self, "Warning", "Please fill in all required fields and ensure correct support setup.")
+            return
+
         #data = calc.perform_analysis_determinate(10, 1, 1, 100, [(3, 0)], [(10, 10)], [], [])
-        data = calc.perform_analysis_determinate(length, elasticity, inertia, 100, supports, point_loads, distributed_loads, moments)
-        
+        # start coarse, nodes sit on every load and support and the mesh is refined where needed
+        if self.client is not None:
+            self.worker.submit(self.client.analyze, *inputs[:3], 20, *inputs[3:], tolerance=1e-3)
+        else:
+            self.worker.submit(result_cache.cached_analysis, self.result_cache, *inputs[:3], 20, *inputs[3:], tolerance=1e-3)
+        self.cancel_button.setEnabled(True)
+
+    def cancel_analysis(self):
+        self.worker.cancel()
+        self.cancel_button.setEnabled(False)
+        self.progress_label.setText("Analysis cancelled")
+
+    def show_progress(self, request_id, stage):
+        self.progress_label.setText(f"Analysing: {stage}")
+
+    def show_failure(self, request_id, message):
+        self.cancel_button.setEnabled(False)
+        self.progress_label.setText("Analysis failed")
+        if not self.live_checkbox.isChecked():
+            QMessageBox.warning(self, "Warning", f"The analysis failed: {message}")
+
+    def show_results(self, request_id, data):
+        self.cancel_button.setEnabled(False)
+        self.progress_label.setText("")
+
         shear = data['shear_forces']
         moment = data['bending_moments'] * -1
         deflection = data['deflections']
         supports_reactions = data['support_reactions']
 
-        # Draw shear force diagram
-        self.shear_force_canvas.figure.clear()
-        ax = self.shear_force_canvas.figure.add_subplot(111)
-        ax.plot(shear)
-        ax.set_title("Shear Force Diagram")
-        ax.set_xlabel("Position (m)")
-        ax.set_ylabel("Shear Force (N)")
-        self.shear_force_canvas.draw()
-
-        # Draw bending moment diagram
-        self.bending_moment_canvas.figure.clear()
-        ax = self.bending_moment_canvas.figure.add_subplot(111)
-        ax.plot(moment)
-        ax.set_title("Bending Moment Diagram")
-        ax.set_xlabel("Position (m)")
-        ax.set_ylabel("Bending Moment (Nm)")
-        self.bending_moment_canvas.draw()
-
-        # Draw deflection diagram
-        self.deflection_canvas.figure.clear()
-        ax = self.deflection_canvas.figure.add_subplot(111)
-        ax.plot(deflection)
-        ax.set_title("Deflection Diagram")
-        ax.set_xlabel("Position (m)")
-        ax.set_ylabel("Deflection (m)")
-        self.deflection_canvas.draw()
+        # nodes are not evenly spaced, so the diagrams are drawn against their positions
+        node_coords = data['node_coords']
+        blit = self.live_checkbox.isChecked()
+        with profiling.profile('gui.render') as render:
+            with profiling.stage('draw shear'):
+                self.shear_force_plot.update(node_coords, shear, blit)
+            with profiling.stage('draw moment'):
+                self.bending_moment_plot.update(node_coords, moment, blit)
+            with profiling.stage('draw deflection'):
+                self.deflection_plot.update(node_coords, deflection, blit)
+
+        # only with BEAM_PROFILE set, see profiling.py
+        if render is not None and 'timings' in data:
+            self.progress_label.setText(f"{profiling.format_summary(data['timings'])}; render {render.total * 1e3:.1f} ms")
+            if profiling.TRACE_FILE:
+                profiling.write_trace(profiling.TRACE_FILE)
 
         #calculate maximum stress, maximum shear force, maximum bending moment
-        max_shear = max(abs(shear))
-        max_moment = max(abs(moment))
-        max_deflection = max(abs(deflection))
+        max_shear = abs(shear).max()
+        max_moment = abs(moment).max()
+        max_deflection = abs(deflection).max()
 
         self.max_shear_value.setText(f"{max_shear:.4e}")
         self.max_moment_value.setText(f"{max_moment:.4e}")
@@ -301,10 +380,9 @@ class BeamAnalysisApp(QWidget):
 
         # Show support reactions
         # Clear previous support reactions
-        for i in reversed(range(self.layout().itemAt(0).layout().count())):
-            widget = self.layout().itemAt(0).layout().itemAt(i).widget()
-            if isinstance(widget, QLabel) and "at" in widget.text():
-                widget.deleteLater()
+        for reaction_label in self.reaction_labels:
+            reaction_label.deleteLater()
+        self.reaction_labels = []
 
         for reaction in supports_reactions:
             position = reaction['position']
@@ -321,6 +399,7 @@ class BeamAnalysisApp(QWidget):
             if support_type == "Fixed":
                 reaction_label.setText(reaction_label.text() + f", Moment = {moment:.4e} Nm")
             self.layout().itemAt(0).layout().addWidget(reaction_label)
+            self.reaction_labels.append(reaction_label)
             
 
 
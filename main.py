@@ -1,9 +1,11 @@
 # main.py
-from gui import BeamAnalysisApp
-from PyQt5.QtWidgets import QApplication
 import sys
 
 def main():
+    # Qt and matplotlib are only imported when the GUI starts
+    from PyQt5.QtWidgets import QApplication
+    from gui import BeamAnalysisApp
+
     app = QApplication(sys.argv)
     ex = BeamAnalysisApp()
     ex.show()
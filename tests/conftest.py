@@ -0,0 +1,29 @@
+##Shared fixtures of the test suite
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from beam_analyzer import singularity  # noqa: E402
+
+# beam used by most tests
+LENGTH = 10.0
+ELASTICITY = 2e8
+INERTIA = 1e-4
+EI = ELASTICITY * INERTIA
+SIMPLY_SUPPORTED = [(2, 0), (1, LENGTH)]
+
+
+@pytest.fixture
+def exact():
+    """ singularity function diagrams of a determinate beam at any positions"""
+    def diagrams(supports, point_loads, distributed_loads, moments, positions):
+        return singularity.determinate_diagrams(LENGTH, ELASTICITY, INERTIA, supports, point_loads, distributed_loads, moments, positions)
+    return diagrams
+
+
+def relative_error(values, reference):
+    return float(abs(values - reference).max() / abs(reference).max())
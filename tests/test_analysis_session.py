@@ -0,0 +1,76 @@
+##analysis_session: incremental load edits on a factored beam
+import numpy as np
+import pytest
+
+from beam_analyzer import AnalysisSession, calculator_two as calc
+from conftest import LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, relative_error
+
+
+def direct(point_loads, distributed_loads, session):
+    return calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 100, SIMPLY_SUPPORTED, point_loads, distributed_loads, [],
+                                             node_coords=session.system['node_coords'])
+
+
+def test_load_edits_match_a_full_analysis():
+    session = AnalysisSession()
+    session.set_geometry(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED)
+    point = session.add_load('point_loads', (10, 3.3))
+    udl = session.add_load('distributed_loads', ('2', 0, LENGTH))
+    session.update_load(point, (4, 7.1))
+    data = session.solve()
+    reference = direct([(4, 7.1)], [('2', 0, LENGTH)], session)
+    for key in ('shear_forces', 'bending_moments', 'deflections'):
+        assert relative_error(data[key], reference[key]) < 1e-12
+    session.remove_load(udl)
+    assert relative_error(session.solve()['deflections'], direct([(4, 7.1)], [], session)['deflections']) < 1e-12
+
+
+def test_session_past_the_solve_limit():
+    session = AnalysisSession()
+    session.set_geometry(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, num_elements=5000)
+    session.add_load('point_loads', (10, 3.3))
+    session.add_load('distributed_loads', ('1 + sin(x)', 2, 9))
+    data = session.solve()
+    assert len(data['node_coords']) == 5001
+    reference = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 5000, SIMPLY_SUPPORTED, [(10, 3.3)],
+                                                  [('1 + sin(x)', 2, 9)], [], node_coords=data['node_coords'])
+    for key in ('shear_forces', 'bending_moments', 'deflections'):
+        assert relative_error(data[key], reference[key]) < 1e-8
+    assert [reaction['force'] for reaction in data['support_reactions']] == \
+        pytest.approx([reaction['force'] for reaction in reference['support_reactions']], rel=1e-8)
+
+
+def test_udl_reactions_are_exact():
+    session = AnalysisSession()
+    session.set_geometry(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, num_elements=7)
+    session.add_load('distributed_loads', ('2', 0, LENGTH))
+    assert [reaction['force'] for reaction in session.solve()['support_reactions']] == pytest.approx([10, 10], rel=1e-10)
+
+
+def test_loads_survive_invalidate():
+    session = AnalysisSession()
+    session.set_geometry(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED)
+    first = session.add_load('point_loads', (10, 5))
+    second = session.add_load('point_loads', (5, 3))
+    session.invalidate()
+    session.update_load(first, (20, 5))
+    session.remove_load(second)
+    session.set_geometry(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED)
+    assert [reaction['force'] for reaction in session.solve()['support_reactions']] == pytest.approx([10, 10], rel=1e-8)
+
+
+def test_geometries_are_reused():
+    session = AnalysisSession(max_systems=2)
+    for inertia in (INERTIA, 2 * INERTIA, INERTIA):
+        session.set_geometry(LENGTH, ELASTICITY, inertia, SIMPLY_SUPPORTED)
+    assert session.cache_info()['hits'] == 1
+    assert session.cache_info()['misses'] == 2
+
+
+def test_sample_between_nodes(exact):
+    session = AnalysisSession()
+    session.set_geometry(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, num_elements=4)
+    session.add_load('distributed_loads', ('sin(x)', 0, LENGTH))
+    positions = np.linspace(0, LENGTH, 41)
+    reference = exact(SIMPLY_SUPPORTED, [], [('sin(x)', 0, LENGTH)], [], positions)
+    assert relative_error(session.sample(positions)['bending_moments'], reference['bending_moments']) < 1e-10
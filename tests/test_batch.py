@@ -0,0 +1,73 @@
+##batch: headless analysis of beam files with streamed output
+import io
+import json
+
+import numpy as np
+import pytest
+
+import batch
+from beam_analyzer import calculator_two as calc
+from conftest import LENGTH, ELASTICITY, INERTIA
+
+BEAM = {'length': LENGTH, 'elasticity': ELASTICITY, 'inertia': INERTIA, 'num_elements': 20,
+        'supports': [[2, 0], [1, LENGTH]], 'point_loads': [[10, 3]], 'distributed_loads': [['2', 0, LENGTH]]}
+
+CSV = """id,length,elasticity,inertia,num_elements,supports,point_loads,distributed_loads
+first,10,2e8,1e-4,20,"[[2, 0], [1, 10]]","[[10, 3]]","[[""2"", 0, 10]]"
+second,10,2e8,1e-4,,"[[3, 0]]",,
+"""
+
+
+def test_jsonl_and_csv_inputs_agree(tmp_path):
+    (tmp_path / 'beams.jsonl').write_text(json.dumps(dict(BEAM, id='first')) + '\n\n' + json.dumps({'length': 5}) + '\n')
+    (tmp_path / 'beams.csv').write_text(CSV)
+    from_jsonl = list(batch.read_beams(str(tmp_path / 'beams.jsonl')))
+    from_csv = list(batch.read_beams(str(tmp_path / 'beams.csv')))
+    assert [beam['id'] for beam in from_jsonl] == ['first', '2']
+    assert from_csv[0] == dict(BEAM, id='first', moments=[])
+    # empty cells are left out, the lists default to empty
+    assert from_csv[1] == {'id': 'second', 'length': LENGTH, 'elasticity': ELASTICITY, 'inertia': INERTIA, 'supports': [[3, 0]],
+                           'point_loads': [], 'distributed_loads': [], 'moments': []}
+
+
+def test_cli_writes_summaries_and_arrays(tmp_path):
+    (tmp_path / 'beams.csv').write_text(CSV)
+    output = tmp_path / 'results.jsonl'
+    assert batch.main([str(tmp_path / 'beams.csv'), '--output', str(output), '--arrays-dir', str(tmp_path / 'arrays'), '-j', '2']) == 0
+    summaries = {summary['id']: summary for summary in map(json.loads, output.read_text().splitlines())}
+    assert set(summaries) == {'first', 'second'}
+    reference = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 20, [(2, 0), (1, LENGTH)], [(10, 3)], [('2', 0, LENGTH)], [])
+    assert summaries['first']['max_moment'] == pytest.approx(np.abs(reference['bending_moments']).max())
+    with np.load(summaries['first']['arrays']) as arrays:
+        assert arrays['deflections'] == pytest.approx(reference['deflections'])
+
+
+def test_failures_are_reported(tmp_path):
+    (tmp_path / 'beams.jsonl').write_text(json.dumps(dict(BEAM, id='bad', distributed_loads=[['(', 0, LENGTH]])) + '\n')
+    output = tmp_path / 'results.jsonl'
+    assert batch.main([str(tmp_path / 'beams.jsonl'), '--output', str(output), '-j', '1']) == 1
+    summary = json.loads(output.read_text())
+    assert summary['status'] == 'error' and 'ValueError' in summary['error']
+
+
+def test_results_stream_before_the_input_is_read():
+    consumed = []
+
+    def beams():
+        for j in range(40):
+            consumed.append(j)
+            yield dict(BEAM, id=str(j), point_loads=[[10, 1 + j / 10]])
+
+    class Output(io.StringIO):
+        first_write = None
+
+        def write(self, text):
+            if self.first_write is None:
+                self.first_write = len(consumed)
+            return super().write(text)
+
+    output = Output()
+    assert batch.run_batch(beams(), output, workers=1, chunk_size=2, max_pending=2) == (40, 0)
+    # at most max_pending chunks are read ahead of the results
+    assert output.first_write <= 3 * 2
+    assert len(output.getvalue().splitlines()) == 40
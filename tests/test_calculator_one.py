@@ -0,0 +1,31 @@
+##calculator_one: reactions of determinate beams only
+import pytest
+
+from beam_analyzer import calculator_one
+from beam_analyzer.beam_model import BeamModel
+from conftest import LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED
+
+
+@pytest.mark.parametrize('symbolic', [False, True])
+def test_simply_supported_reactions(symbolic):
+    beam = calculator_one.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, [(10, 3)], [('x * 0.1', 0, LENGTH)], [],
+                                                       symbolic=symbolic)
+    # the reactions are the last two rows, on the axis of the loads
+    assert float(beam[-2, 2]) == pytest.approx(-(7 + 5 / 3))
+    assert float(beam[-1, 2]) == pytest.approx(-(3 + 10 / 3))
+
+
+@pytest.mark.parametrize('symbolic', [False, True])
+def test_indeterminate_beams_raise(symbolic):
+    # a propped cantilever has three unknowns for two equations
+    with pytest.raises(ValueError, match='indeterminate'):
+        calculator_one.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, [(3, 0), (1, LENGTH)], [(10, 5)], [], [], symbolic=symbolic)
+
+
+def test_batch_support_forces():
+    models = [BeamModel.from_inputs(LENGTH, SIMPLY_SUPPORTED, [(10, position)], [], []) for position in (2.0, 5.0)]
+    reactions = calculator_one.batch_support_forces(models)
+    assert reactions[0] == pytest.approx({'R_0': -8, 'R_1': -2})
+    assert reactions[1] == pytest.approx({'R_0': -5, 'R_1': -5})
+    with pytest.raises(ValueError):
+        calculator_one.batch_support_forces(models + [BeamModel.from_inputs(LENGTH, [(3, 0), (1, LENGTH)], [(10, 5)], [], [])])
@@ -0,0 +1,86 @@
+##calculator_two: nodal values, fine meshes and sampled diagrams
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc
+from conftest import LENGTH, ELASTICITY, INERTIA, EI, SIMPLY_SUPPORTED, relative_error
+
+
+def test_udl_nodal_values_are_exact(exact):
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 5, SIMPLY_SUPPORTED, [], [('2', 0, LENGTH)], [])
+    assert [reaction['force'] for reaction in data['support_reactions']] == pytest.approx([10, 10], rel=1e-12)
+    reference = exact(SIMPLY_SUPPORTED, [], [('2', 0, LENGTH)], [], data['node_coords'])
+    # the last node holds the end of the last element, opposite sign
+    assert relative_error(data['bending_moments'][:-1], reference['bending_moments'][:-1]) < 1e-12
+    assert relative_error(data['shear_forces'][:-1], reference['shear_forces'][:-1]) < 1e-12
+    assert relative_error(data['deflections'], reference['deflections']) < 1e-12
+
+
+def test_loads_between_nodes(exact):
+    point_loads, distributed_loads, moments = [(5, 3.3)], [('1 + x', 2, 9)], [(7, 6)]
+    node_coords = np.linspace(0, LENGTH, 6)
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 5, SIMPLY_SUPPORTED, point_loads, distributed_loads, moments,
+                                             node_coords=node_coords)
+    reference = exact(SIMPLY_SUPPORTED, point_loads, distributed_loads, moments, node_coords)
+    assert relative_error(data['bending_moments'][:-1], reference['bending_moments'][:-1]) < 1e-12
+    assert relative_error(data['deflections'], reference['deflections']) < 1e-12
+
+
+@pytest.mark.parametrize('num_elements', [10**4, 10**5])
+def test_fine_meshes_stay_accurate(num_elements):
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, num_elements, SIMPLY_SUPPORTED, [(10, 5)], [], [])
+    x = data['node_coords']
+    assert len(x) == num_elements + 1
+    arm = np.minimum(x, LENGTH - x)
+    closed_form = -10 * arm * (3 * LENGTH**2 - 4 * arm**2) / (48 * EI)
+    assert relative_error(data['deflections'], closed_form) < 1e-8
+    assert data['support_reactions'][0]['force'] == pytest.approx(5, rel=1e-8)
+
+
+@pytest.mark.parametrize('num_elements', [10**4, 10**5])
+def test_varying_section_past_the_solve_limit(num_elements):
+    supports, point_loads, distributed_loads = [(3, 0), (1, 6), (2, LENGTH)], [(10, 3.3)], [('1 + sin(x)', 2, 9)]
+    inertia = np.where(np.arange(num_elements) < num_elements // 2, INERTIA, 3 * INERTIA)
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, inertia, num_elements, supports, point_loads, distributed_loads, [])
+    assert len(data['node_coords']) == num_elements + 1
+    # the same two sections on 20 elements, sampled exactly at the fine nodes
+    reference = calc.perform_analysis_determinate(LENGTH, ELASTICITY, np.repeat([INERTIA, 3 * INERTIA], 10), 20, supports, point_loads,
+                                                  distributed_loads, [], sample_points=data['node_coords'])['samples']
+    for key in ('shear_forces', 'bending_moments', 'deflections'):
+        assert relative_error(data[key][:-1], reference[key][:-1]) < 1e-8
+
+
+def test_explicit_solve_mesh_past_the_limit_raises():
+    node_coords = np.linspace(0, LENGTH, calc.MAX_SOLVE_ELEMENTS + 2)
+    with pytest.raises(ValueError, match='too fine'):
+        calc.assemble_system(node_coords, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, solve_coords=node_coords)
+
+
+def test_load_cases_match_single_analyses():
+    supports = [(3, 0), (1, LENGTH)]
+    cases = [{'name': 'point', 'point_loads': [(10, 4)]}, {'name': 'udl', 'distributed_loads': [('3', 0, LENGTH)]}]
+    for num_elements in (20, 5000):
+        results = calc.perform_analysis_load_cases(LENGTH, ELASTICITY, INERTIA, num_elements, supports, cases,
+                                                   [{'name': 'both', 'factors': {'point': 1.5, 'udl': 2}}])
+        single = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, num_elements, supports, [(15, 4)], [('6', 0, LENGTH)], [],
+                                                   node_coords=results['node_coords'])
+        for key in ('shear_forces', 'bending_moments', 'deflections'):
+            assert relative_error(results[key][0], single[key]) < 1e-8
+
+
+@pytest.mark.parametrize('load_expr', ['sin(x)', '10*sin(3*x)', 'exp(x / 3)', 'x**2 / 10 + 3'])
+def test_sample_diagrams_are_exact_for_smooth_loads(exact, load_expr):
+    positions = np.linspace(0, LENGTH, 101)
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 3, SIMPLY_SUPPORTED, [(5, 4)], [(load_expr, 0, LENGTH)], [],
+                                             sample_points=positions)
+    reference = exact(SIMPLY_SUPPORTED, [(5, 4)], [(load_expr, 0, LENGTH)], [], positions)
+    for key in ('deflections', 'rotations', 'bending_moments', 'shear_forces'):
+        assert relative_error(data['samples'][key], reference[key]) < 1e-10
+
+
+def test_sample_diagrams_at_the_nodes_match_plots_data():
+    point_loads, distributed_loads = [(5, 4)], [('10*sin(3*x)', 1, 8)]
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 12, SIMPLY_SUPPORTED, point_loads, distributed_loads, [],
+                                             sample_points=calc.generate_mesh(LENGTH, 12, SIMPLY_SUPPORTED, point_loads, distributed_loads))
+    for key in ('shear_forces', 'bending_moments', 'deflections'):
+        assert relative_error(data['samples'][key][:-1], data[key][:-1]) < 1e-10
@@ -0,0 +1,27 @@
+##downsampling: peak preserving reduction of diagrams for plotting
+import numpy as np
+
+from beam_analyzer.downsampling import downsample_min_max
+
+
+def test_peaks_are_kept():
+    x = np.linspace(0, 10, 100001)
+    y = np.sin(x) + 0.01 * np.random.default_rng(0).standard_normal(len(x))
+    y[12345], y[67890] = 5.0, -7.0
+    kept_x, kept_y = downsample_min_max(x, y, 200)
+    assert len(kept_x) <= 4 * 200
+    assert kept_y.max() == 5.0 and kept_y.min() == -7.0
+    assert kept_x[0] == x[0] and kept_x[-1] == x[-1]
+    assert np.all(np.diff(kept_x) > 0)
+    # every bin keeps its extremes
+    bins = np.minimum((x / 10 * 200).astype(int), 199)
+    kept_bins = np.minimum((kept_x / 10 * 200).astype(int), 199)
+    for reduce in (np.maximum, np.minimum):
+        assert np.array_equal(reduce.reduceat(kept_y, np.flatnonzero(np.diff(kept_bins, prepend=-1))),
+                              reduce.reduceat(y, np.flatnonzero(np.diff(bins, prepend=-1))))
+
+
+def test_short_lines_are_unchanged():
+    x = np.linspace(0, 1, 50)
+    kept_x, kept_y = downsample_min_max(x, x**2, 20)
+    assert np.array_equal(kept_x, x) and np.array_equal(kept_y, x**2)
@@ -0,0 +1,54 @@
+##expression_cache: memoized parsing and integration of load expressions
+import pytest
+
+from beam_analyzer import calculator_one, expression_cache
+from conftest import LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    expression_cache.cache_clear()
+    yield
+    expression_cache.cache_clear()
+
+
+def test_integrals_are_exact():
+    equal_force, first_moment = expression_cache.integrals('3*x**2', 0, 2)
+    assert float(equal_force) == pytest.approx(8)
+    assert float(first_moment) == pytest.approx(12)
+    # new bounds only substitute into the stored antiderivatives
+    assert expression_cache.compile_expression('3*x**2').numeric_integrals(1, 2) == pytest.approx((7, 11.25))
+
+
+def test_hits_and_misses():
+    expression_cache.integrals('2*x', 0, 5)
+    expression_cache.integrals('2*x', 0, 5)
+    expression_cache.integrals('2*x', 1, 5)
+    info = expression_cache.cache_info()
+    assert info['integrals'] == {'hits': 1, 'misses': 2, 'size': 2, 'maxsize': 4096}
+    # the other bounds reuse the parsed and compiled expression
+    assert info['compiled']['misses'] == 1 and info['compiled']['hits'] == 1
+
+
+def test_equivalent_strings_share_the_compiled_expression():
+    expression_cache.compile_expression('x*2')
+    assert expression_cache.compile_expression('2*x') is expression_cache.compile_expression('x*2')
+    assert expression_cache.cache_info()['parsed']['misses'] == 2
+
+
+def test_lru_bounds():
+    cache = expression_cache.LRUCache(maxsize=2)
+    cache.get('a', lambda: 1)
+    cache.get('b', lambda: 2)
+    # 'a' is now the most recently used, 'b' is dropped for 'c'
+    assert cache.get('a', lambda: None) == 1
+    cache.get('c', lambda: 3)
+    assert cache.info() == {'hits': 1, 'misses': 3, 'size': 2, 'maxsize': 2}
+    assert cache.get('b', lambda: 'again') == 'again'
+    assert cache.get('a', lambda: 'dropped') == 'dropped'
+
+
+def test_repeated_analyses_skip_integration():
+    for _ in range(3):
+        calculator_one.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, [], [('x * 0.1', 0, LENGTH)], [])
+    assert expression_cache.cache_info()['compiled']['misses'] == 1
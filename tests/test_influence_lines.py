@@ -0,0 +1,54 @@
+##calculator_two: influence lines and moving loads
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc
+from conftest import LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, relative_error
+
+
+@pytest.mark.parametrize('supports', [SIMPLY_SUPPORTED, [(3, 0), (1, LENGTH)]])
+def test_influence_lines_match_point_load_analyses(supports):
+    lines = calc.influence_lines(LENGTH, ELASTICITY, INERTIA, 20, supports, [2.5, 5.0])
+    node_coords = lines['node_coords']
+    section_nodes = calc.nearest_nodes(node_coords, lines['sections'])
+    for node in (3, 10, 17):
+        data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 20, supports, [(1, node_coords[node])], [], [],
+                                                 node_coords=node_coords)
+        for response in calc.RESPONSES:
+            assert lines[response][:, node] == pytest.approx(data[response][section_nodes], rel=1e-8, abs=1e-12)
+
+
+@pytest.mark.parametrize('supports', [SIMPLY_SUPPORTED, [(3, 0), (1, 6), (2, LENGTH)]])
+def test_influence_lines_past_the_solve_limit(supports):
+    num_elements = 5000
+    lines = calc.influence_lines(LENGTH, ELASTICITY, INERTIA, num_elements, supports, [2.5, 5.0])
+    node_coords = lines['node_coords']
+    assert len(node_coords) == num_elements + 1
+    section_nodes = calc.nearest_nodes(node_coords, lines['sections'])
+    # loads just right of a section sit inside its coarse solve element
+    for position in (1.0, 2.51, 5.03, 8.5):
+        node = calc.nearest_nodes(node_coords, [position])[0]
+        data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, num_elements, supports, [(1, node_coords[node])], [], [],
+                                                 node_coords=node_coords)
+        for response in calc.RESPONSES:
+            assert lines[response][:, node] == pytest.approx(data[response][section_nodes], rel=1e-8, abs=1e-10)
+
+
+def test_midspan_moment_influence_line():
+    lines = calc.influence_lines(LENGTH, ELASTICITY, INERTIA, 20, SIMPLY_SUPPORTED, [LENGTH / 2], responses=('bending_moments',))
+    x = lines['node_coords']
+    # sagging moments are negative in plots_data
+    assert relative_error(lines['bending_moments'][0], -np.minimum(x, LENGTH - x) / 2) < 1e-8
+
+
+def test_moving_axle_envelope():
+    results = calc.moving_load_analysis(LENGTH, ELASTICITY, INERTIA, 20, SIMPLY_SUPPORTED, [LENGTH / 2], [10.0])
+    moments = results['bending_moments']
+    assert moments['min'][0] == pytest.approx(-10 * LENGTH / 4, rel=1e-8)
+    assert moments['min_position'][0] == pytest.approx(LENGTH / 2)
+
+
+def test_moving_axle_envelope_past_the_solve_limit():
+    results = calc.moving_load_analysis(LENGTH, ELASTICITY, INERTIA, 5000, SIMPLY_SUPPORTED, [LENGTH / 2], [10.0])
+    assert results['bending_moments']['min'][0] == pytest.approx(-10 * LENGTH / 4, rel=1e-8)
+    assert results['deflections']['min'][0] == pytest.approx(-10 * LENGTH**3 / (48 * ELASTICITY * INERTIA), rel=1e-8)
@@ -0,0 +1,33 @@
+##calculator_two: natural frequencies and mode shapes
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc
+from conftest import LENGTH, ELASTICITY, INERTIA, EI, SIMPLY_SUPPORTED
+
+MASS = 5.0
+# omega_k = (k pi / L)^2 sqrt(EI / m) for a simply supported beam
+EXACT = np.array([(k * np.pi / LENGTH)**2 * np.sqrt(EI / MASS) for k in (1, 2, 3)])
+
+
+@pytest.mark.parametrize('num_elements', [100, 20000])
+def test_simply_supported_frequencies(num_elements):
+    results = calc.modal_analysis(LENGTH, ELASTICITY, INERTIA, MASS, num_elements, SIMPLY_SUPPORTED, num_modes=3)
+    assert results['angular_frequencies'] == pytest.approx(EXACT, rel=1e-6)
+    x = results['node_coords']
+    first = np.sin(np.pi * x / LENGTH)
+    assert np.abs(np.abs(results['mode_shapes'][0]) - first).max() < 1e-6
+
+
+def test_constant_arrays_take_the_coarse_mesh():
+    num_elements = 20000
+    results = calc.modal_analysis(LENGTH, ELASTICITY, np.full(num_elements, INERTIA), np.full(num_elements, MASS), num_elements,
+                                  SIMPLY_SUPPORTED, num_modes=3)
+    assert results['angular_frequencies'] == pytest.approx(EXACT, rel=1e-6)
+
+
+def test_varying_properties_past_the_solve_limit_raise():
+    num_elements = calc.MAX_SOLVE_ELEMENTS + 1
+    with pytest.raises(ValueError):
+        calc.modal_analysis(LENGTH, ELASTICITY, np.linspace(1, 2, num_elements) * INERTIA, MASS, num_elements, SIMPLY_SUPPORTED,
+                            num_modes=3)
@@ -0,0 +1,62 @@
+##out_of_core: memory mapped results of very large meshes
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc, out_of_core
+from conftest import LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, relative_error
+
+
+@pytest.mark.parametrize('load_expr', ['sin(x)', '10*sin(3*x)'])
+def test_whole_span_loads(tmp_path, exact, load_expr):
+    results = out_of_core.perform_analysis_out_of_core(tmp_path, LENGTH, ELASTICITY, INERTIA, 20000, SIMPLY_SUPPORTED, [],
+                                                       [(load_expr, 0, LENGTH)], [], dtype=np.float64, chunk_size=4096)
+    x = np.asarray(results['node_coords'])
+    reference = exact(SIMPLY_SUPPORTED, [], [(load_expr, 0, LENGTH)], [], x)
+    assert relative_error(results['bending_moments'][:-1], reference['bending_moments'][:-1]) < 1e-8
+    assert relative_error(results['deflections'], reference['deflections']) < 1e-8
+
+
+def test_matches_the_in_memory_analysis(tmp_path):
+    arguments = (LENGTH, ELASTICITY, np.linspace(1, 2, 200) * INERTIA, 200, [(3, 0), (1, LENGTH), (2, 5)], [(7, 2.2)],
+                 [('3', 0, LENGTH)], [(3, 7.7)])
+    results = out_of_core.perform_analysis_out_of_core(tmp_path, *arguments, dtype=np.float64, chunk_size=37)
+    reference = calc.perform_analysis_determinate(*arguments)
+    for key in ('node_coords', 'shear_forces', 'bending_moments', 'deflections'):
+        assert relative_error(results[key], reference[key]) < 1e-8
+    assert results['extrema']['deflections']['min'] == pytest.approx(reference['deflections'].min())
+    assert [reaction['force'] for reaction in results['support_reactions']] == \
+        pytest.approx([reaction['force'] for reaction in reference['support_reactions']])
+
+
+@pytest.mark.parametrize('inertia', [INERTIA, np.linspace(1, 2, 1000) * INERTIA])
+def test_chunked_mesh_is_the_mesh_of_build_mesh(tmp_path, inertia):
+    arguments = (LENGTH, ELASTICITY, inertia, 1000, SIMPLY_SUPPORTED, [(7, 3.33)], [('1', 1.234, 8)], [])
+    node_coords = out_of_core.write_mesh(tmp_path / 'node_coords.npy', *arguments, chunk_size=77)
+    assert np.array_equal(node_coords, calc.build_mesh(*arguments))
+
+
+def test_loads_on_the_end_node(tmp_path):
+    arguments = (LENGTH, ELASTICITY, INERTIA, 3000, [(3, 0)], [(10, LENGTH), (5, 4.4)], [('2', 0, LENGTH)], [(3, LENGTH)])
+    results = out_of_core.perform_analysis_out_of_core(tmp_path, *arguments, dtype=np.float64, chunk_size=1000)
+    reference = calc.perform_analysis_determinate(*arguments)
+    for key in ('shear_forces', 'bending_moments', 'deflections'):
+        assert relative_error(results[key], reference[key]) < 1e-8
+    # the end node keeps the end of the last element, which carries the tip load
+    assert results['shear_forces'][-1] == pytest.approx(-10, rel=1e-8)
+
+
+def test_float32_files(tmp_path):
+    results = out_of_core.perform_analysis_out_of_core(tmp_path, LENGTH, ELASTICITY, INERTIA, 1000, SIMPLY_SUPPORTED, [(10, 5)], [], [])
+    assert results['deflections'].dtype == np.float32
+    reopened = np.load(tmp_path / 'deflections.npy', mmap_mode='r')
+    assert reopened[500] == pytest.approx(-10 * LENGTH**3 / (48 * ELASTICITY * INERTIA), rel=1e-6)
+
+
+def test_varying_section_past_the_solve_limit(tmp_path):
+    num_elements = 3 * calc.MAX_SOLVE_ELEMENTS
+    arguments = (LENGTH, ELASTICITY, np.linspace(1, 2, num_elements) * INERTIA, num_elements, SIMPLY_SUPPORTED, [(10, 5)],
+                 [('2', 1, 8)], [])
+    results = out_of_core.perform_analysis_out_of_core(tmp_path, *arguments, dtype=np.float64, chunk_size=1000)
+    reference = calc.perform_analysis_determinate(*arguments)
+    for key in ('shear_forces', 'bending_moments', 'deflections'):
+        assert relative_error(results[key], reference[key]) < 1e-8
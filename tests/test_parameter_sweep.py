@@ -0,0 +1,41 @@
+##parameter_sweep: one factorization for many sections and spans
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc, parameter_sweep
+from conftest import ELASTICITY, INERTIA, relative_error
+
+
+def test_sweep_matches_single_analyses():
+    supports = [(3, 0), (1, 1)]
+    # everything relative to the span, the expression too
+    point_loads, distributed_loads, moments = [(5, 0.3)], [('2 + x', 0.2, 0.9)], [(3, 0.5)]
+    spans, scales = np.array([5.0, 10.0]), np.array([1.0, 2.5])
+    results = parameter_sweep.sweep(ELASTICITY, [INERTIA, 2 * INERTIA], spans, 20, supports, point_loads, distributed_loads, moments,
+                                    load_scales=scales)
+    for i, (inertia, span, scale) in enumerate(zip([INERTIA, 2 * INERTIA], spans, scales)):
+        data = calc.perform_analysis_determinate(
+            span, ELASTICITY, inertia, 20, [(3, 0), (1, span)], [(scale * 5, 0.3 * span)],
+            [(f'{scale} * (2 + x / {span})', 0.2 * span, 0.9 * span)], [(scale * 3, 0.5 * span)])
+        for key in ('shear_forces', 'bending_moments', 'deflections'):
+            assert relative_error(results[key][i], data[key]) < 1e-8
+
+
+def test_sweep_past_the_solve_limit():
+    num_elements = 5000
+    supports, point_loads, distributed_loads = [(3, 0), (1, 1)], [(5, 0.3)], [('sin(3 * x)', 0, 1)]
+    spans = np.array([5.0, 10.0])
+    results = parameter_sweep.sweep(ELASTICITY, INERTIA, spans, num_elements, supports, point_loads, distributed_loads, [])
+    assert results['deflections'].shape == (2, num_elements + 1)
+    for i, span in enumerate(spans):
+        data = calc.perform_analysis_determinate(span, ELASTICITY, INERTIA, num_elements, [(3, 0), (1, span)], [(5, 0.3 * span)],
+                                                 [(f'sin(3 * x / {span})', 0, span)], [], node_coords=results['node_coords'][i])
+        for key in ('shear_forces', 'bending_moments', 'deflections'):
+            assert relative_error(results[key][i], data[key]) < 1e-8
+
+
+def test_grid_shape():
+    results = parameter_sweep.sweep([1e8, 2e8], [1e-4, 2e-4, 3e-4], 10.0, 10, [(2, 0), (1, 1)], [(10, 0.5)], [], [], grid=True)
+    assert results['deflections'].shape == (6, 11)
+    # the deflections scale with 1 / EI
+    assert results['max_deflection'][0] == pytest.approx(6 * results['max_deflection'][5])
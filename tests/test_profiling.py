@@ -0,0 +1,56 @@
+##profiling: stage timings, the timings entry and Chrome traces
+import json
+
+import pytest
+
+from beam_analyzer import calculator_two as calc, profiling
+from conftest import LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED
+
+ARGUMENTS = (LENGTH, ELASTICITY, INERTIA, 50, SIMPLY_SUPPORTED, [(10, 3)], [('2', 0, LENGTH)], [])
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(profiling, 'ENABLED', True)
+
+
+def test_off_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(profiling, 'ENABLED', False)
+    # one shared context manager, nothing is recorded
+    assert profiling.stage('solve') is profiling.stage('assembly')
+    with profiling.profile('analysis') as profile:
+        profiling.record('num_dofs', 10)
+    assert profile is None and profiling.current() is None
+    assert 'timings' not in calc.perform_analysis_determinate(*ARGUMENTS)
+
+
+def test_timings_entry(enabled):
+    timings = calc.perform_analysis_determinate(*ARGUMENTS)['timings']
+    assert timings['name'] == 'calculator_two'
+    assert timings['num_dofs'] == 2 * 51
+    assert timings['peak_memory_mib'] > 0
+    assert {'stiffness', 'factorization'} <= {name.rsplit('.', 1)[-1] for name in timings['stages']}
+    top_level = sum(duration for name, duration in timings['stages'].items() if '.' not in name)
+    assert top_level <= timings['total']
+    assert profiling.format_summary(timings).startswith('calculator_two: ')
+
+
+def test_nested_profiles_are_stages(enabled):
+    with profiling.profile('outer') as outer:
+        with profiling.profile('inner'):
+            with profiling.stage('work'):
+                pass
+    assert [name for name, _, _ in outer.events] == ['inner.work', 'inner']
+
+
+def test_write_trace(tmp_path, enabled):
+    profiling.recent.clear()
+    for _ in range(2):
+        calc.perform_analysis_determinate(*ARGUMENTS)
+    path = profiling.write_trace(tmp_path / 'trace.json')
+    events = json.loads(path.read_text())['traceEvents']
+    analyses = [event for event in events if event['cat'] == 'analysis']
+    assert len(analyses) == 2
+    # laid out one after the other
+    assert analyses[1]['ts'] >= analyses[0]['ts'] + analyses[0]['dur']
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
@@ -0,0 +1,65 @@
+##result_cache: content addressed plots_data on disk
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc, result_cache
+from conftest import LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED
+
+
+def analysis(force):
+    return calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 200, SIMPLY_SUPPORTED, [(force, 3)], [], [])
+
+
+def store(directory, key, force):
+    result_cache.ResultCache(directory).put(key, analysis(force))
+    return key
+
+
+def test_hits_are_memory_mapped(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path))
+    arguments = (LENGTH, ELASTICITY, INERTIA, 200, SIMPLY_SUPPORTED, [(10, 3)], [], [])
+    first = result_cache.cached_analysis(cache, *arguments)
+    second = result_cache.cached_analysis(cache, *arguments)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert isinstance(second['deflections'], np.memmap)
+    assert np.array_equal(second['deflections'], first['deflections'])
+    assert second['support_reactions'] == pytest.approx(first['support_reactions'])
+    # 10 and 10.0 are the same input
+    assert result_cache.analysis_key(LENGTH, ELASTICITY, INERTIA, 200, SIMPLY_SUPPORTED, [(10.0, 3)], [], []) == \
+        result_cache.analysis_key(*arguments)
+
+
+def test_solver_version_invalidates(tmp_path, monkeypatch):
+    key = result_cache.cache_key(value=1)
+    monkeypatch.setattr(result_cache, 'SOLVER_VERSION', 'calculator_two/next')
+    assert result_cache.cache_key(value=1) != key
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path))
+    for age, key in enumerate(('hit', 'stale', 'new')):
+        cache.put(key, analysis(10 + age))
+        os.utime(os.path.join(cache.entries, key), (1e9 + age, 1e9 + age))
+    # a hit makes an entry the most recently used one
+    assert cache.get('hit') is not None
+    cache.evict(cache.info()['bytes'] - 1)
+    assert sorted(os.listdir(cache.entries)) == ['hit', 'new']
+    cache.clear()
+    assert cache.info()['entries'] == 0 and os.listdir(cache.tmp) == []
+
+
+@pytest.mark.parametrize('executor', [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_concurrent_puts(tmp_path, executor):
+    keys = ['same'] * 4 + [f'key_{j}' for j in range(4)]
+    with executor(max_workers=4) as pool:
+        list(pool.map(store, [str(tmp_path)] * len(keys), keys, range(len(keys))))
+    cache = result_cache.ResultCache(str(tmp_path))
+    assert cache.info()['entries'] == 5
+    # every entry is complete and nothing is left in tmp/
+    for key in set(keys):
+        data = cache.get(key)
+        assert data is not None and len(data['deflections']) == 201
+    assert os.listdir(cache.tmp) == []
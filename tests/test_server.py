@@ -0,0 +1,103 @@
+##server: batching, caching, the HTTP round trip and what it refuses
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc, result_cache, server
+from conftest import LENGTH, ELASTICITY, INERTIA
+
+BEAM = {'length': LENGTH, 'elasticity': ELASTICITY, 'inertia': INERTIA, 'num_elements': 10, 'supports': [[2, 0], [1, LENGTH]]}
+
+
+def test_geometry_key_includes_the_load_positions():
+    assert server.geometry_key(dict(BEAM, point_loads=[[10, 5]])) == server.geometry_key(dict(BEAM, point_loads=[[7, 5]]))
+    assert server.geometry_key(dict(BEAM, point_loads=[[10, 5]])) != \
+        server.geometry_key(dict(BEAM, point_loads=[[10, 5]], distributed_loads=[['1', 3.3, LENGTH]]))
+    assert server.geometry_key(dict(BEAM, tolerance=1e-3)) is None
+
+
+def test_group_results_equal_single_results():
+    beams = [dict(BEAM, point_loads=[[10, 5]]), dict(BEAM, point_loads=[[7, 5]], moments=[[2, 5]])]
+    grouped = [server.decode_result(result) for result in server.analyze_group(beams)]
+    for beam, result in zip(beams, grouped):
+        single = server.decode_result(server.analyze_request(beam))
+        for name in server.ARRAYS:
+            assert result[name] == pytest.approx(single[name], rel=1e-10, abs=1e-12)
+        assert [reaction['force'] for reaction in result['support_reactions']] == \
+            pytest.approx([reaction['force'] for reaction in single['support_reactions']])
+
+
+def test_groups_go_through_the_cache(tmp_path):
+    beams = [dict(BEAM, point_loads=[[10, 5]]), dict(BEAM, point_loads=[[7, 5]])]
+    first = server.analyze_group(beams, str(tmp_path))
+    assert result_cache.ResultCache(str(tmp_path)).info()['entries'] == 2
+    assert server.analyze_group(beams, str(tmp_path)) == first
+    # a single request of the same beam hits the entry of the group
+    cache = result_cache.ResultCache(str(tmp_path))
+    result_cache.cached_analysis(cache, *server.beam_arguments(beams[0]))
+    assert cache.hits == 1
+
+
+def test_encode_round_trip():
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 10, [(3, 0)], [(10, LENGTH)], [], [])
+    decoded = server.decode_result(server.encode_result(data))
+    assert decoded['deflections'] == pytest.approx(data['deflections'])
+    assert decoded['support_reactions'][0]['moment'] == pytest.approx(data['support_reactions'][0]['moment'])
+
+
+@pytest.fixture
+def analysis_server():
+    analysis_server = server.AnalysisServer('127.0.0.1:0', workers=1)
+    thread = threading.Thread(target=analysis_server.serve_forever, daemon=True)
+    thread.start()
+    yield analysis_server
+    analysis_server.shutdown()
+    analysis_server.server_close()
+
+
+def test_http_round_trip(analysis_server):
+    client = server.AnalysisClient('%s:%d' % analysis_server.server_address)
+    assert client.health()
+    arguments = (LENGTH, ELASTICITY, INERTIA, 20, [(2, 0), (1, LENGTH)], [(10, 3)], [('2', 0, LENGTH)], [])
+    data = client.analyze(*arguments)
+    reference = calc.perform_analysis_determinate(*arguments)
+    assert np.abs(data['bending_moments'] - reference['bending_moments']).max() < 1e-10
+    with pytest.raises(ValueError):
+        client.analyze(LENGTH, ELASTICITY, INERTIA, 20, [(2, 0), (1, LENGTH)], [], [('(', 0, LENGTH)], [])
+    assert client.metrics()['requests'] == 2
+
+
+def test_other_content_types_are_refused(analysis_server):
+    connection = http.client.HTTPConnection(*analysis_server.server_address, timeout=30)
+    try:
+        connection.request('POST', '/analyze', json.dumps(BEAM).encode(), {'Content-Type': 'text/plain'})
+        response = connection.getresponse()
+        assert response.status == 415
+        assert 'application/json' in json.loads(response.read())['error']
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize('load_expr', ['__import__("os").system("true")', 'np.load("beam.npy")', '().__class__', 'x.real',
+                                       'open("beam.json")', 'sin(x, out=x)', '"1" * 9', 'lambda: 1', '9 ** 9 ** 9'])
+def test_load_expressions_outside_the_whitelist_are_refused(load_expr):
+    with pytest.raises((ValueError, OverflowError)):
+        calc.compile_load_expression(load_expr)(np.linspace(0, LENGTH, 3))
+
+
+def test_whitelisted_load_expressions():
+    x = np.linspace(1, LENGTH, 5)
+    load_function = calc.compile_load_expression('2 + np.sin(pi * x / 10) - abs(-x)^2 / sqrt(exp(log(x)))')
+    assert load_function(x) == pytest.approx(2 + np.sin(np.pi * x / 10) - x**2 / np.sqrt(x))
+
+
+def test_remote_addresses_need_allow_remote():
+    assert server.is_loopback('127.0.0.1') and server.is_loopback('localhost')
+    assert not server.is_loopback('0.0.0.0')
+    with pytest.raises(ValueError, match='loopback'):
+        server.AnalysisServer('0.0.0.0:0', workers=1)
+    with pytest.raises(SystemExit):
+        server.main(['--address', '0.0.0.0:0'])
@@ -0,0 +1,45 @@
+##singularity: exact diagrams of determinate beams
+import numpy as np
+import pytest
+
+from beam_analyzer import calculator_two as calc, singularity
+from beam_analyzer.beam_model import BeamModel
+from conftest import LENGTH, ELASTICITY, INERTIA, EI, SIMPLY_SUPPORTED
+
+
+def test_cantilever_tip_deflection():
+    results = singularity.determinate_diagrams(LENGTH, ELASTICITY, INERTIA, [(3, 0)], [(10, LENGTH)], [], [], 11)
+    assert results['deflections'][-1] == pytest.approx(-10 * LENGTH**3 / (3 * EI))
+    assert results['bending_moments'][0] == pytest.approx(10 * LENGTH)
+
+
+def test_simply_supported_udl():
+    x = np.linspace(0, LENGTH, 21)
+    results = singularity.determinate_diagrams(LENGTH, ELASTICITY, INERTIA, SIMPLY_SUPPORTED, [], [('3', 0, LENGTH)], [], x)
+    assert results['deflections'] == pytest.approx(-3 * x * (LENGTH**3 - 2 * LENGTH * x**2 + x**3) / (24 * EI))
+
+
+@pytest.mark.parametrize('supports, point_loads, moments', [(SIMPLY_SUPPORTED, [(10, 3)], []),
+                                                           ([(3, 0)], [(10, 3), (4, LENGTH)], [(5, LENGTH)])])
+def test_plots_data_signs(supports, point_loads, moments):
+    data = calc.perform_analysis_determinate(LENGTH, ELASTICITY, INERTIA, 10, supports, point_loads, [('2', 0, LENGTH)], moments)
+    results = singularity.determinate_diagrams(LENGTH, ELASTICITY, INERTIA, supports, point_loads, [('2', 0, LENGTH)], moments,
+                                               data['node_coords'])
+    for key in ('shear_forces', 'bending_moments'):
+        assert results[key][:-1] == pytest.approx(data[key][:-1], abs=1e-9)
+        # the last node of plots_data holds the end of the last element
+        assert results[key][-1] == pytest.approx(-data[key][-1], abs=1e-9)
+    assert results['deflections'] == pytest.approx(data['deflections'])
+
+
+def test_more_than_two_support_conditions_raise():
+    model = BeamModel.from_inputs(LENGTH, [(2, 0), (1, 5), (1, LENGTH)], [(10, 3)], [], [])
+    model.set_reactions(np.zeros(3))
+    model.moment[np.isnan(model.moment)] = 0
+    with pytest.raises(ValueError, match='two support conditions'):
+        singularity.diagram_coefficients(model, ELASTICITY, INERTIA)
+
+
+def test_indeterminate_beams_raise():
+    with pytest.raises(ValueError):
+        singularity.determinate_diagrams(LENGTH, ELASTICITY, INERTIA, [(3, 0), (1, LENGTH)], [(10, 5)], [], [], 11)